@@ -0,0 +1,253 @@
+import re
+import sys
+import json
+import argparse
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for batch analytics
+    np = None
+
+from main import (SentimentLexicon, SENTIMENT_TOKEN_RE, ENTITY_STOP_WORDS, CAPITALIZED_WORD_RE,
+                  CAPITALIZED_PHRASE_RE, QUOTED_TERM_RE)
+
+# Sentiment codes of sub-tokens; labels are numbered from zero in lexicon order
+OTHER, NEGATION, PUNCTUATION = -1, -2, -3
+
+# A capitalized word ending a token, and one starting a token: the two halves of a phrase
+PHRASE_HEAD_RE = re.compile(r"\b[A-Z][a-z]+$")
+PHRASE_TAIL_RE = re.compile(r"[A-Z][a-z]+\b")
+
+
+class CorpusAnalysis:
+    """
+    Columnar analytics for a list of messages. The corpus is split on
+    whitespace once into integer ids over a shared vocabulary; sentiment
+    codes and entity candidates are derived per vocabulary entry and spread
+    over the token stream with array operations.
+
+    Results match the per-message HorizonAI functions: sentiment() matches
+    analyze_sentiment, entities() matches extract_entities (as sets) and
+    ngram_counts() matches the counts detect_patterns stores, before any
+    PatternStore pruning.
+    """
+
+    def __init__(self, messages, lexicon=None):
+        if np is None:
+            raise ImportError("Batch analytics needs NumPy: pip install numpy")
+
+        self.messages = list(messages)
+        self.lexicon = lexicon or SentimentLexicon()
+        self.labels = list(self.lexicon.patterns)
+
+        # Split the corpus in one call and map the tokens to ids in a shared vocabulary; joining on
+        # whitespace gives the same tokens as splitting each message without keeping a list per message
+        lengths = np.fromiter(map(len, map(str.split, self.messages)), dtype=np.int64, count=len(self.messages))
+        tokens = " ".join(self.messages).split()
+        vocabulary = {token: index for index, token in enumerate(dict.fromkeys(tokens))}
+        self.token_ids = np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+        self.vocabulary = np.array(list(vocabulary), dtype=object)
+        self.token_messages = np.repeat(np.arange(len(self.messages)), lengths)
+
+        # Whether each token is followed by another token of the same message
+        self._joined = self.token_messages[1:] == self.token_messages[:-1]
+
+        # Lowercased words, as detect_patterns counts them, get their own shared ids
+        lower_index = {}
+        self.lower_of = np.fromiter((lower_index.setdefault(word.lower(), len(lower_index)) for word in vocabulary),
+                                    dtype=np.int64, count=len(vocabulary))
+        self.words = np.array(list(lower_index), dtype=object)
+
+        self._scores = None
+        self._entities = None
+
+    def __len__(self):
+        return len(self.messages)
+
+    def sentiment_scores(self):
+        """(messages, labels) array of sentiment word counts, as SentimentLexicon.score counts them"""
+        if self._scores is not None:
+            return self._scores
+
+        lexicon = self.lexicon
+        label_index = {label: index for index, label in enumerate(self.labels)}
+
+        # Sentiment sub-tokens of every vocabulary entry, as a flat code array with offsets
+        codes = []
+        counts = np.zeros(len(self.vocabulary), dtype=np.int64)
+        for entry, word in enumerate(self.vocabulary):
+            sub_tokens = SENTIMENT_TOKEN_RE.findall(word.lower().replace("\u2019", "'"))
+            counts[entry] = len(sub_tokens)
+            for token in sub_tokens:
+                if lexicon.is_negation(token):
+                    codes.append(NEGATION)
+                elif not token[0].isalpha():
+                    codes.append(PUNCTUATION)
+                else:
+                    label = lexicon.label(token)
+                    codes.append(OTHER if label is None else label_index[label])
+        codes = np.array(codes, dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        # Spread the sub-tokens over the token stream
+        stream_counts = counts[self.token_ids]
+        total = int(stream_counts.sum())
+        stream_starts = np.cumsum(stream_counts) - stream_counts
+        gather = np.repeat(starts[self.token_ids] - stream_starts, stream_counts) + np.arange(total)
+        stream = codes[gather]
+        messages = np.repeat(self.token_messages, stream_counts)
+        positions = np.arange(total)
+
+        # A word is negated by the last negation before it, if it is in the same message,
+        # no punctuation came in between and it is within the negation scope
+        message_starts = np.zeros(len(self.messages), dtype=np.int64)
+        if total:
+            first = np.concatenate(([True], messages[1:] != messages[:-1]))
+            message_starts[messages[first]] = positions[first]
+        last_negation = np.maximum.accumulate(np.where(stream == NEGATION, positions, -1))
+        last_punctuation = np.maximum.accumulate(np.where(stream == PUNCTUATION, positions, -1))
+        negated = ((last_negation > last_punctuation) & (last_negation >= message_starts[messages])
+                   & (positions - last_negation <= lexicon.negation_scope))
+
+        labelled = stream >= 0
+        labels = stream.copy()
+        if "positive" in label_index and "negative" in label_index:
+            positive, negative = label_index["positive"], label_index["negative"]
+            labels[negated & (stream == positive)] = negative
+            labels[negated & (stream == negative)] = positive
+
+        width = len(self.labels)
+        self._scores = np.bincount(messages[labelled] * width + labels[labelled],
+                                   minlength=len(self.messages) * width).reshape(len(self.messages), width)
+        return self._scores
+
+    def sentiment(self):
+        """Dominant sentiment label per message, as analyze_sentiment returns it"""
+        scores = self.sentiment_scores()
+        names = np.array(self.labels + ["neutral"], dtype=object)
+        winners = scores.argmax(axis=1) if len(self.labels) else np.zeros(len(self.messages), dtype=np.int64)
+        if len(self.labels):
+            winners[scores.max(axis=1) == 0] = len(self.labels)
+        return names[winners]
+
+    def ngram_counts(self, n):
+        """Distinct lowercased n-grams as an (ngrams, n) id array into words, with their counts"""
+        words = self.lower_of[self.token_ids]
+        if len(words) < n:
+            return np.zeros((0, n), dtype=np.int64), np.zeros(0, dtype=np.int64)
+        valid = np.ones(len(words) - n + 1, dtype=bool)
+        for offset in range(n - 1):
+            valid &= self._joined[offset:len(words) - n + 1 + offset]
+        columns = [words[offset:len(words) - n + 1 + offset][valid] for offset in range(n)]
+        if not columns[0].size:
+            return np.zeros((0, n), dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        size = len(self.words)
+        if size ** n < 2 ** 62:
+            # Pack each n-gram into one integer so counting is a single sort
+            packed = columns[0].copy()
+            for column in columns[1:]:
+                packed = packed * size + column
+            unique, counts = np.unique(packed, return_counts=True)
+            ngrams = np.empty((len(unique), n), dtype=np.int64)
+            for offset in range(n - 1, -1, -1):
+                unique, ngrams[:, offset] = np.divmod(unique, size)
+            return ngrams, counts
+        return np.unique(np.stack(columns, axis=1), axis=0, return_counts=True)
+
+    def pattern_counts(self):
+        """Every unigram, bigram and trigram with its count, keyed like PatternStore"""
+        counts = {}
+        for n in (1, 2, 3):
+            ngrams, totals = self.ngram_counts(n)
+            for ngram, total in zip(self.words[ngrams].tolist(), totals.tolist()):
+                counts[tuple(ngram)] = total
+        return counts
+
+    def most_common(self, limit=10):
+        """The most frequent n-grams across the corpus as ((words...), count) pairs"""
+        best = []
+        for n in (1, 2, 3):
+            ngrams, totals = self.ngram_counts(n)
+            top = np.argsort(-totals, kind="stable")[:limit]
+            best.extend((tuple(self.words[ngrams[index]]), int(totals[index])) for index in top)
+        return sorted(best, key=lambda item: -item[1])[:limit]
+
+    def entities(self):
+        """Entity candidates per message, as the sets extract_entities returns"""
+        if self._entities is not None:
+            return self._entities
+
+        vocabulary = self.vocabulary
+        capitalized = [[word for word in CAPITALIZED_WORD_RE.findall(entry) if word not in ENTITY_STOP_WORDS]
+                       for entry in vocabulary]
+        has_capitalized = np.fromiter(map(bool, capitalized), dtype=bool, count=len(vocabulary))
+        phrase_head = np.fromiter((PHRASE_HEAD_RE.search(entry) is not None for entry in vocabulary),
+                                  dtype=bool, count=len(vocabulary))
+        phrase_tail = np.fromiter((PHRASE_TAIL_RE.match(entry) is not None for entry in vocabulary),
+                                  dtype=bool, count=len(vocabulary))
+        has_quote = np.fromiter(('"' in entry for entry in vocabulary), dtype=bool, count=len(vocabulary))
+
+        entities = [set() for _ in self.messages]
+
+        # Single capitalized words come straight from the vocabulary
+        flagged = has_capitalized[self.token_ids]
+        for message, entry in zip(self.token_messages[flagged].tolist(), self.token_ids[flagged].tolist()):
+            entities[message].update(capitalized[entry])
+
+        # Phrases and quotes depend on the exact spacing, so only messages that can contain
+        # them are scanned with the original expressions
+        ids = self.token_ids
+        pairs = phrase_head[ids[:-1]] & phrase_tail[ids[1:]] & self._joined
+        for message in np.unique(self.token_messages[:-1][pairs]).tolist():
+            entities[message].update(CAPITALIZED_PHRASE_RE.findall(self.messages[message]))
+        for message in np.unique(self.token_messages[has_quote[self.token_ids]]).tolist():
+            entities[message].update(QUOTED_TERM_RE.findall(self.messages[message]))
+
+        self._entities = entities
+        return entities
+
+    def summary(self, limit=10):
+        """Corpus-wide sentiment distribution, top n-grams and top entities"""
+        entity_counts = Counter(entity for entities in self.entities() for entity in entities)
+        labels, counts = np.unique(self.sentiment(), return_counts=True)
+        return {
+            "messages": len(self.messages),
+            "tokens": int(len(self.token_ids)),
+            "vocabulary": int(len(self.vocabulary)),
+            "sentiment": dict(zip(labels.tolist(), counts.tolist())),
+            "top_patterns": [[" ".join(ngram), count] for ngram, count in self.most_common(limit)],
+            "top_entities": entity_counts.most_common(limit),
+        }
+
+
+def read_messages(path):
+    """Read user messages from a history archive (JSONL turns) or a plain text file of one message per line"""
+    messages = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("{"):
+                try:
+                    messages.append(json.loads(line)["user_input"])
+                    continue
+                except (ValueError, KeyError):
+                    pass
+            if line:
+                messages.append(line)
+    return messages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch sentiment, pattern and entity analytics over a transcript archive")
+    parser.add_argument("archive", help="history archive JSONL or a text file with one message per line")
+    parser.add_argument("--top", type=int, default=10, help="number of patterns and entities to report")
+    args = parser.parse_args()
+
+    try:
+        analysis = CorpusAnalysis(read_messages(args.archive))
+    except ImportError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(analysis.summary(args.top), indent=2, ensure_ascii=False))
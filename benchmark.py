@@ -0,0 +1,377 @@
+import os
+import gc
+import math
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import wikipediaapi
+
+from main import HorizonAI, USER_AGENT, Fore, Style
+
+# Metrics compared against a baseline, with whether a higher value is better
+COMPARED_METRICS = {
+    "throughput": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "peak_memory_mb": False,
+}
+
+TOPIC_WORDS = ["quantum", "river", "empire", "galaxy", "protein", "language", "volcano", "symphony",
+               "algorithm", "glacier", "revolution", "enzyme", "cathedral", "satellite", "desert", "theorem"]
+TOPIC_KINDS = ["physics", "system", "history", "theory", "architecture", "music", "biology", "engineering"]
+CHAT_OPENERS = ["I think", "Honestly", "Yesterday I read that", "My friend says", "It seems like", "I feel that"]
+CHAT_WORDS = ["good", "bad", "happy", "sad", "interesting", "boring", "important", "difficult", "easy",
+              "beautiful", "amazing", "terrible", "great", "awful", "love", "hate", "not", "really", "very"]
+# Dependencies main must only import on first use
+LAZY_MODULES = ("requests", "wikipediaapi", "colorama", "difflib")
+
+QUESTION_FORMS = ["What is {}?", "Who is {}?", "Tell me about {}", "Can you explain {}?",
+                  "What do you know about {}?", "Where is {}?", "How does {} work?"]
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(len(ordered) * q) - 1)] if ordered else 0.0
+
+
+def latency_stats(samples, elapsed):
+    """Throughput and latency percentiles (in milliseconds) for per-call timings in seconds"""
+    return {
+        "calls": len(samples),
+        "throughput": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 4),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 4),
+    }
+
+
+def topic_title(index):
+    """Title of the index-th synthetic article"""
+    return f"{TOPIC_WORDS[index % len(TOPIC_WORDS)].title()} {TOPIC_KINDS[index // len(TOPIC_WORDS) % len(TOPIC_KINDS)].title()} {index}"
+
+
+def build_corpus(turns, topics=200, long_ratio=0.2, seed=42):
+    """Build a reproducible list of user messages mixing questions, chat and long messages"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(turns):
+        roll = rng.random()
+        if roll < 0.45:
+            corpus.append(rng.choice(QUESTION_FORMS).format(topic_title(rng.randrange(topics))))
+        else:
+            length = rng.randint(25, 80) if rng.random() < long_ratio else rng.randint(4, 12)
+            words = [rng.choice(CHAT_WORDS + TOPIC_WORDS) for _ in range(length)]
+            corpus.append(f"{rng.choice(CHAT_OPENERS)} {' '.join(words)}.")
+    return corpus
+
+
+class StubWikipediaHandler(BaseHTTPRequestHandler):
+    """Answers the MediaWiki query and opensearch calls HorizonAI makes"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; Nagle's algorithm would delay the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.server.requests += 1
+
+        if params.get("action") == "opensearch":
+            query = params.get("search", "").casefold()
+            titles = [title for title in self.server.titles if title.casefold().startswith(query)][:10]
+            body = [params.get("search", ""), titles, [], []]
+        else:
+            pages = {}
+            for index, title in enumerate(params.get("titles", "").split("|")):
+                if title in self.server.articles:
+                    pages[str(index + 1)] = {
+                        "pageid": index + 1,
+                        "ns": 0,
+                        "title": title,
+                        "fullurl": "https://en.wikipedia.org/wiki/" + title.replace(" ", "_"),
+                        "extract": self.server.articles[title],
+                    }
+                else:
+                    pages[str(-index - 1)] = {"ns": 0, "title": title, "missing": ""}
+            body = {"batchcomplete": "", "query": {"pages": pages}}
+
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubWikipedia:
+    """
+    Local stand-in for the Wikipedia API with configurable latency. Every
+    topic_title() exists except each fifth one, so misses and searches are
+    exercised too.
+    """
+
+    def __init__(self, topics=200, latency=0.02):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubWikipediaHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency
+        self.server.requests = 0
+        self.server.titles = [topic_title(index) for index in range(topics)]
+        self.server.articles = {
+            title: f"{title} is a synthetic article used for benchmarking. It has several sentences. "
+                   f"Each sentence adds a little text. The summary is long enough to be truncated. " * 3
+            for index, title in enumerate(self.server.titles) if index % 5
+        }
+        self.api_url = f"http://127.0.0.1:{self.server.server_address[1]}/w/api.php"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubWikipediaClient(wikipediaapi.Wikipedia):
+    """wikipediaapi client that sends its queries to a stub server"""
+
+    api_url = None
+
+    def _build_url(self, language):
+        return self.api_url
+
+
+class BenchmarkHorizonAI(HorizonAI):
+    """HorizonAI pointed at a stub Wikipedia server"""
+
+    def make_wiki_client(self, language="en"):
+        client = StubWikipediaClient(language=language, extract_format=wikipediaapi.ExtractFormat.WIKI,
+                                     user_agent=USER_AGENT, timeout=self.http.timeout[1])
+        client.api_url = self.api_url
+        return client
+
+
+def new_instance(stub, workdir, history_size):
+    """Fresh headless instance with its own cache and knowledge base files"""
+    for name in ("cache.json", "knowledge.db", "knowledge.db-wal", "knowledge.db-shm"):
+        path = os.path.join(workdir, name)
+        if os.path.exists(path):
+            os.unlink(path)
+    return BenchmarkHorizonAI(mode="headless", api_url=stub.api_url, tracing=True, checkpoint_interval=0,
+                              cache_path=os.path.join(workdir, "cache.json"),
+                              knowledge_path=os.path.join(workdir, "knowledge.db"),
+                              history_size=history_size, history_search_window=history_size)
+
+
+def time_calls(function, inputs):
+    """Call function on every input and return per-call timings and total elapsed seconds"""
+    samples = []
+    start = time.perf_counter()
+    for item in inputs:
+        call_start = time.perf_counter()
+        function(item)
+        samples.append(time.perf_counter() - call_start)
+    return samples, time.perf_counter() - start
+
+
+def bench_session(stub, workdir, turns, seed, sample_size=500, measure_memory=True):
+    """Drive one session of the given length and measure the pipeline and its components"""
+    corpus = build_corpus(turns, topics=len(stub.server.titles), seed=seed)
+    random.seed(seed)
+    ai = new_instance(stub, workdir, turns)
+    requests_before = stub.requests
+    try:
+        samples, elapsed = time_calls(ai.generate_response, corpus)
+        results = {"generate_response": latency_stats(samples, elapsed)}
+        results["generate_response"]["stub_requests"] = stub.requests - requests_before
+        results["stages"] = ai.latency.summary()["stages"]
+        results["events"] = ai.latency.summary()["events"]
+
+        # Components are measured on the warmed instance, so find_relevant_response sees the full history
+        sample = build_corpus(min(sample_size, max(turns, 10)), topics=len(stub.server.titles), seed=seed + 1)
+        for name in ("extract_question_subject", "analyze_sentiment", "detect_patterns", "find_relevant_response"):
+            results[name] = latency_stats(*time_calls(getattr(ai, name), sample))
+    finally:
+        ai.shutdown()
+
+    # Peak memory is measured in a separate pass so tracemalloc does not skew the timings
+    if measure_memory:
+        random.seed(seed)
+        gc.collect()
+        tracemalloc.start()
+        ai = new_instance(stub, workdir, turns)
+        try:
+            for message in corpus:
+                ai.generate_response(message)
+            results["generate_response"]["peak_memory_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        finally:
+            tracemalloc.stop()
+            ai.shutdown()
+    return results
+
+
+def run_benchmarks(sizes, latency=0.02, topics=200, seed=42, measure_memory=True):
+    """Run every session size against a fresh stub server and return the results"""
+    stub = StubWikipedia(topics=topics, latency=latency)
+    workdir = tempfile.mkdtemp(prefix="horizon-bench-")
+    try:
+        results = {
+            "config": {"sizes": sizes, "latency": latency, "topics": topics, "seed": seed,
+                       "python": sys.version.split()[0]},
+            "sessions": {},
+        }
+        for turns in sizes:
+            print(f"{Fore.CYAN}Benchmarking a session of {turns} turns...{Style.RESET_ALL}")
+            results["sessions"][str(turns)] = bench_session(stub, workdir, turns, seed,
+                                                            measure_memory=measure_memory)
+        return results
+    finally:
+        stub.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def import_time(module="main", runs=5):
+    """
+    Best cumulative import time of module in milliseconds over several fresh
+    interpreters, measured with -X importtime, and every module it pulled in.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    # Bytecode must be written once, or every run would time compiling the source
+    env = {name: value for name, value in os.environ.items() if name != "PYTHONDONTWRITEBYTECODE"}
+    best = None
+    imported = set()
+    for run in range(runs + 1):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=directory,
+                                env=env, capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            imported.add(name.strip())
+            # The module itself is the only line with no import nesting; the first run only warms up
+            if run and name == f" {module}":
+                elapsed = int(cumulative) / 1000
+                best = elapsed if best is None else min(best, elapsed)
+    return best, imported
+
+
+def check_import_budget(budget_ms, module="main", runs=5):
+    """Return a description of every way importing module breaks the budget or loads a lazy dependency"""
+    elapsed, imported = import_time(module, runs)
+    print(f"\n{Fore.GREEN}import {module}: {elapsed:.1f} ms (budget {budget_ms:.1f} ms){Style.RESET_ALL}")
+    problems = []
+    if elapsed > budget_ms:
+        problems.append(f"import {module} took {elapsed:.1f} ms, over the {budget_ms:.1f} ms budget")
+    for name in LAZY_MODULES:
+        if name in imported:
+            problems.append(f"import {module} loaded {name}, which must be imported on first use")
+    return problems
+
+
+def print_report(results):
+    """Print throughput and latency percentiles for every session size"""
+    for turns, session in results["sessions"].items():
+        print(f"\n{Fore.GREEN}Session of {turns} turns{Style.RESET_ALL}")
+        for name, stats in session.items():
+            if name in ("stages", "events"):
+                continue
+            line = (f"  {name:<30} {stats['throughput']:>10.1f}/s  p50 {stats['p50_ms']:>8.3f} ms"
+                    f"  p95 {stats['p95_ms']:>8.3f} ms  p99 {stats['p99_ms']:>8.3f} ms")
+            if "peak_memory_mb" in stats:
+                line += f"  peak {stats['peak_memory_mb']:.1f} MB"
+            print(line)
+        for name, stats in session["stages"].items():
+            print(f"  {'stage ' + name:<30} {'':>12}  p50 {stats['p50']:>8.3f} ms"
+                  f"  p95 {stats['p95']:>8.3f} ms  p99 {stats['p99']:>8.3f} ms")
+        print(f"  events: {session['events']}")
+
+
+def compare(results, baseline, tolerance=0.1, min_change_ms=0.1):
+    """
+    Return a description of every metric that regressed beyond tolerance
+    against the baseline. Latency changes under min_change_ms are timer noise.
+    """
+    regressions = []
+    for turns, session in results["sessions"].items():
+        base_session = baseline.get("sessions", {}).get(turns)
+        if base_session is None:
+            continue
+        for name, stats in session.items():
+            base_stats = base_session.get(name)
+            if name in ("stages", "events") or base_stats is None:
+                continue
+            for metric, higher_is_better in COMPARED_METRICS.items():
+                if metric not in stats or not base_stats.get(metric):
+                    continue
+                if metric.endswith("_ms") and abs(stats[metric] - base_stats[metric]) < min_change_ms:
+                    continue
+                change = (stats[metric] - base_stats[metric]) / base_stats[metric]
+                if (-change if higher_is_better else change) > tolerance:
+                    regressions.append(f"{turns} turns {name} {metric}: {base_stats[metric]} -> {stats[metric]} "
+                                       f"({change:+.0%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the HorizonAI pipeline against a local Wikipedia stub")
+    parser.add_argument("--sizes", default="10,100,1000",
+                        help="comma separated session lengths in turns")
+    parser.add_argument("--latency", type=float, default=0.02, help="stub API latency in seconds")
+    parser.add_argument("--topics", type=int, default=200, help="distinct articles asked about")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory pass")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results to this JSON file")
+    parser.add_argument("--baseline", metavar="PATH", help="compare the results against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="relative change treated as a regression when comparing")
+    parser.add_argument("--import-budget", type=float, metavar="MS",
+                        help="fail if importing main takes longer or loads a lazy dependency")
+    parser.add_argument("--import-only", action="store_true", help="only run the import check")
+    args = parser.parse_args()
+
+    if args.import_budget is not None or args.import_only:
+        problems = check_import_budget(50.0 if args.import_budget is None else args.import_budget)
+        for problem in problems:
+            print(f"{Fore.RED}  {problem}{Style.RESET_ALL}")
+        if problems:
+            sys.exit(1)
+        if args.import_only:
+            sys.exit(0)
+
+    results = run_benchmarks([int(size) for size in args.sizes.split(",")], latency=args.latency,
+                             topics=args.topics, seed=args.seed, measure_memory=not args.no_memory)
+    print_report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n{Fore.GREEN}Baseline saved to {args.save_baseline}{Style.RESET_ALL}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), tolerance=args.tolerance)
+        if regressions:
+            print(f"\n{Fore.RED}Regressions beyond {args.tolerance:.0%}:{Style.RESET_ALL}")
+            for regression in regressions:
+                print(f"{Fore.RED}  {regression}{Style.RESET_ALL}")
+            sys.exit(1)
+        print(f"\n{Fore.GREEN}No regressions beyond {args.tolerance:.0%}{Style.RESET_ALL}")
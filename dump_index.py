@@ -0,0 +1,229 @@
+import os
+import io
+import bz2
+import gzip
+import json
+import mmap
+import heapq
+import argparse
+import tempfile
+import xml.etree.ElementTree as ElementTree
+
+# Files that make up an offline summary index directory
+SUMMARIES_FILE = "summaries.dat"
+TITLES_FILE = "titles.idx"
+
+# Titles in the abstract dumps are prefixed with the site name
+ABSTRACT_TITLE_PREFIX = "Wikipedia: "
+
+
+def default_key():
+    """The subject normalization HorizonAI uses for its own lookups"""
+    from main import normalize_subject
+    return normalize_subject
+
+
+def open_dump(path):
+    """Open a plain, bz2 or gzip compressed dump for streaming binary reads"""
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_abstract_xml(stream):
+    """Yield (title, summary, url) from a Wikipedia abstract XML dump with constant memory"""
+    context = ElementTree.iterparse(stream, events=("start", "end"))
+    _, root = next(context)
+
+    for event, element in context:
+        if event != "end" or element.tag != "doc":
+            continue
+
+        title = (element.findtext("title") or "").strip()
+        if title.startswith(ABSTRACT_TITLE_PREFIX):
+            title = title[len(ABSTRACT_TITLE_PREFIX):]
+        summary = (element.findtext("abstract") or "").strip()
+        url = (element.findtext("url") or "").strip()
+        if title:
+            yield title, summary, url
+
+        # Drop parsed documents so memory does not grow with the dump
+        element.clear()
+        root.clear()
+
+
+def iter_jsonl(stream):
+    """Yield (title, summary, url) from a JSONL dump of {"title", "summary"/"abstract", "url"}"""
+    for line in io.TextIOWrapper(stream, encoding="utf-8"):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        title = (record.get("title") or "").strip()
+        summary = (record.get("summary") or record.get("abstract") or record.get("extract") or "").strip()
+        if title:
+            yield title, summary, record.get("url") or ""
+
+
+def iter_dump(path):
+    """Yield (title, summary, url) from an XML or JSONL dump, picking the parser by extension"""
+    name = path[:-4] if path.endswith(".bz2") else path[:-3] if path.endswith(".gz") else path
+    parser = iter_jsonl if name.endswith((".jsonl", ".json")) else iter_abstract_xml
+    with open_dump(path) as stream:
+        yield from parser(stream)
+
+
+def _write_sorted_run(lines, directory):
+    """Sort one chunk of index lines and write it to a temporary run file"""
+    lines.sort()
+    fd, path = tempfile.mkstemp(prefix="titles.", suffix=".run", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+        f.writelines(lines)
+    return path
+
+
+def build_index(dump_path, output_dir, key=None, chunk_size=200000):
+    """
+    Stream a dump into an offline summary index and return the article count.
+    Summaries are appended to a data file; the title index is sorted with an
+    external merge sort so memory stays bounded by chunk_size.
+    """
+    key = key or default_key()
+    os.makedirs(output_dir, exist_ok=True)
+    runs = []
+    chunk = []
+    count = 0
+
+    try:
+        with open(os.path.join(output_dir, SUMMARIES_FILE), "wb") as data:
+            for title, summary, url in iter_dump(dump_path):
+                offset = data.tell()
+                record = {"title": title, "summary": summary, "url": url}
+                data.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+
+                # The sequence number keeps the first article for duplicate keys; tabs and line
+                # breaks in a title would split its index line, so whitespace is collapsed
+                clean_title = " ".join(title.split())
+                chunk.append(f"{key(title)}\t{count:012d}\t{offset}\t{clean_title}\n")
+                count += 1
+                if len(chunk) >= chunk_size:
+                    runs.append(_write_sorted_run(chunk, output_dir))
+                    chunk = []
+
+        if chunk:
+            runs.append(_write_sorted_run(chunk, output_dir))
+
+        # Merge the sorted runs into the final index, dropping the sequence numbers and every
+        # article but the first for a repeated key
+        run_files = [open(path, "r", encoding="utf-8", newline="\n") for path in runs]
+        try:
+            with open(os.path.join(output_dir, TITLES_FILE), "w", encoding="utf-8", newline="\n") as index:
+                previous = None
+                for line in heapq.merge(*run_files):
+                    subject, _, offset, title = line.split("\t", 3)
+                    if subject == previous:
+                        continue
+                    previous = subject
+                    index.write(f"{subject}\t{offset}\t{title}")
+        finally:
+            for f in run_files:
+                f.close()
+    finally:
+        for path in runs:
+            os.unlink(path)
+
+    return count
+
+
+class SummaryIndex:
+    """
+    Read-only offline summary index built by build_index. Both files are
+    memory-mapped; subjects are found by binary search over the sorted title
+    index, so lookups never load the whole dump.
+    """
+
+    def __init__(self, directory, key=None):
+        self.directory = directory
+        self.key = key or default_key()
+        self._files = []
+        self._titles = self._map(os.path.join(directory, TITLES_FILE))
+        self._summaries = self._map(os.path.join(directory, SUMMARIES_FILE))
+
+    def _map(self, path):
+        """Memory-map a file read-only, or return empty bytes for an empty file"""
+        f = open(path, "rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _seek(self, target):
+        """Byte offset of the first index line whose key is >= target"""
+        titles = self._titles
+        lo, hi = 0, len(titles)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = titles.rfind(b"\n", 0, mid) + 1
+            end = titles.find(b"\n", start)
+            if titles[start:titles.find(b"\t", start)] < target:
+                lo = end + 1
+            else:
+                hi = start
+        return lo
+
+    def _lines_from(self, position):
+        """Yield (key, offset, title) for index lines starting at position"""
+        titles = self._titles
+        while position < len(titles):
+            end = titles.find(b"\n", position)
+            subject, offset, title = titles[position:end].decode("utf-8").split("\t", 2)
+            yield subject, int(offset), title
+            position = end + 1
+
+    def get(self, subject):
+        """Return {"title", "summary", "url"} for a subject, or None if it is not indexed"""
+        target = self.key(subject)
+        for key, offset, _ in self._lines_from(self._seek(target.encode("utf-8"))):
+            if key != target:
+                return None
+            end = self._summaries.find(b"\n", offset)
+            return json.loads(self._summaries[offset:end])
+        return None
+
+    def prefix_search(self, prefix, limit=10):
+        """Return up to limit titles whose normalized form starts with prefix"""
+        target = self.key(prefix)
+        results = []
+        for key, _, title in self._lines_from(self._seek(target.encode("utf-8"))):
+            if not key.startswith(target) or len(results) >= limit:
+                break
+            results.append(title)
+        return results
+
+    def titles(self):
+        """Iterate over every indexed title in key order"""
+        for _, _, title in self._lines_from(0):
+            yield title
+
+    def close(self):
+        """Unmap and close the index files"""
+        for mapped in (self._titles, self._summaries):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        for f in self._files:
+            f.close()
+        self._files = []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build an offline HorizonAI summary index from a Wikipedia dump")
+    parser.add_argument("dump", help="abstract XML or JSONL dump, optionally .bz2 or .gz compressed")
+    parser.add_argument("output", help="directory to write the index to")
+    parser.add_argument("--chunk-size", type=int, default=200000,
+                        help="titles sorted in memory at once while building")
+    args = parser.parse_args()
+
+    total = build_index(args.dump, args.output, chunk_size=args.chunk_size)
+    print(f"Indexed {total} articles into {args.output}")
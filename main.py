@@ -3,17 +3,1482 @@ import time
 import json
 import random
 import string
-import requests
-import wikipediaapi
 import re
 from datetime import datetime
-from difflib import SequenceMatcher
-from colorama import init, Fore, Style
 import threading
+import queue
 import sys
+import tempfile
+import heapq
+import itertools
+import math
+import sqlite3
+from collections import Counter, OrderedDict, deque
+from collections.abc import MutableMapping
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
+
+# requests, wikipediaapi, colorama and difflib are imported where they are first
+# needed, so importing HorizonAI as a library or in a worker process stays cheap
+
+
+class TerminalColors:
+    """
+    Lazy stand-in for colorama's Fore or Style. colorama is imported and
+    initialized on first use, and only when stdout is an interactive terminal;
+    otherwise every color is an empty string.
+    """
+
+    initialized = False
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, color):
+        if color.startswith("_"):
+            raise AttributeError(color)
+        value = ""
+        if getattr(sys.stdout, "isatty", lambda: False)():
+            import colorama
+            if not TerminalColors.initialized:
+                # Initialize colorama for cross-platform colored terminal output
+                colorama.init()
+                TerminalColors.initialized = True
+            value = getattr(getattr(colorama, self._name), color)
+        setattr(self, color, value)
+        return value
+
+
+Fore = TerminalColors("Fore")
+Style = TerminalColors("Style")
+
+# "animated" keeps the classic typing effects, "fast" only animates while real
+# work is in flight and "headless" disables terminal effects and status output
+RESPONSE_MODES = ("animated", "fast", "headless")
+
+USER_AGENT = 'HorizonAI/1.4 (https://horizon-ai.example.com; info@horizon-ai.example.com)'
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+
+# Splits a summary into sentences (with their trailing whitespace) for streaming
+SENTENCE_RE = re.compile(r".*?[.!?](?:\s+|$)|.+", re.S)
+
+
+def normalize_subject(subject):
+    """Normalize a lookup subject so equivalent queries share one key"""
+    return " ".join(subject.split()).casefold()
+
+
+class HTTPClient:
+    """
+    Shared keep-alive HTTP session with a bounded connection budget, explicit
+    connect/read timeouts and exponential backoff with jitter on 429/5xx.
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, pool_size=10, timeout=(3.05, 10.0), max_retries=3, backoff_base=0.5, backoff_max=30.0):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # Every upstream request, whoever issues it, holds one of these slots
+        self.slots = threading.BoundedSemaphore(pool_size)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Pooled requests session, created on first use"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_size,
+                                                            pool_maxsize=self.pool_size)
+                    session = requests.Session()
+                    session.headers["User-Agent"] = USER_AGENT
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number attempt, honouring Retry-After"""
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                from email.utils import parsedate_to_datetime
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(self.backoff_max, max(0.0, delay))
+
+        # Full jitter keeps concurrent clients from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, url, params=None):
+        """GET url, retrying connection errors, timeouts and 429/5xx responses"""
+        import requests
+        attempt = 0
+        while True:
+            try:
+                with self.slots:
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+            else:
+                if response.status_code not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self.backoff_delay(attempt, response.headers.get("Retry-After"))
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        """Close pooled connections"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache with per-entry TTL for Wikipedia lookups.
+    Entries are persisted to a JSON file so repeated lookups survive restarts.
+    """
+
+    def __init__(self, path=None, max_entries=2048, ttl=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> [expires_at, value]
+        self._lock = threading.Lock()
+        self._loaded = path is None
+
+        # Counters used to size the cache
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _ensure_loaded(self):
+        """Load persisted entries on first use instead of at construction"""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    stored = json.load(f)
+                now = time.time()
+                for key, (expires_at, value) in stored.items():
+                    if expires_at > now:
+                        self._entries[key] = [expires_at, value]
+                self._evict()
+        except (OSError, ValueError, TypeError):
+            # A damaged cache file is not fatal - start over with an empty cache
+            self._entries.clear()
+
+    def _evict(self):
+        """Drop least recently used entries until the size bound holds"""
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        """Return a cached value, or default if it is missing or expired"""
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[0] <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entries if full"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._ensure_loaded()
+            self._entries[key] = [expires_at, value]
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        with self._lock:
+            self._loaded = True
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._entries)
+
+    def values(self):
+        """Snapshot of every unexpired cached value"""
+        with self._lock:
+            self._ensure_loaded()
+            now = time.time()
+            return [entry[1] for entry in self._entries.values() if entry[0] > now]
+
+    def stats(self):
+        """Return hit/miss/eviction counters for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def save(self):
+        """Atomically write unexpired entries to disk"""
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._loaded:
+                # Nothing was read or written, the file on disk is current
+                return
+            now = time.time()
+            stored = {key: entry for key, entry in self._entries.items() if entry[0] > now}
+
+        # Write to a temporary file first so a crash never leaves a truncated cache
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".horizon_cache.", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class KnowledgeStore(MutableMapping):
+    """
+    SQLite-backed knowledge base exposing the dict interface HorizonAI uses.
+    Entries are read lazily on first access and memoized in a bounded LRU.
+    Writes go into an open transaction that checkpoint() commits atomically,
+    either periodically from a background thread or on save.
+
+    Values are stored as JSON, so mutating a nested value in place is not
+    persisted until the entry is assigned again.
+    """
+
+    def __init__(self, path, memo_size=4096):
+        self.path = path
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._checkpoint_thread = None
+        self._checkpoint_stop = threading.Event()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+    def _remember(self, key, value):
+        self._memo[key] = value
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+
+    def __getitem__(self, key):
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            value = json.loads(row[0])
+            self._remember(key, value)
+            return value
+
+    def __setitem__(self, key, value):
+        encoded = json.dumps(value)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO entries (key, value) VALUES (?, ?)", (key, encoded))
+            self._dirty = True
+            self._remember(key, value)
+
+    def __delitem__(self, key):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._memo.pop(key, None)
+            if cursor.rowcount == 0:
+                raise KeyError(key)
+            self._dirty = True
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._memo:
+                return True
+            return self._conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def __iter__(self):
+        with self._lock:
+            keys = [row[0] for row in self._conn.execute("SELECT key FROM entries")]
+        return iter(keys)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def keys_with_prefix(self, prefix):
+        """Keys starting with prefix, found with an index range scan"""
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM entries WHERE key >= ? AND key < ?",
+                                      (prefix, prefix + "\U0010ffff")).fetchall()
+        return [row[0] for row in rows]
+
+    def is_empty(self):
+        """Whether the store has no entries, without counting them all"""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM entries LIMIT 1").fetchone() is None
+
+    def update_many(self, items):
+        """Insert many (key, value) pairs in one transaction"""
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO entries (key, value) VALUES (?, ?)",
+                                   ((key, json.dumps(value)) for key, value in items))
+            self._dirty = True
+
+    def checkpoint(self):
+        """Atomically commit every write made since the last checkpoint"""
+        with self._lock:
+            if self._dirty:
+                self._conn.commit()
+                self._dirty = False
+
+    def start_checkpoints(self, interval=30.0):
+        """Commit pending writes every interval seconds from a background thread"""
+        if self._checkpoint_thread is not None:
+            return
+
+        def checkpoint_loop():
+            while not self._checkpoint_stop.wait(interval):
+                try:
+                    self.checkpoint()
+                except sqlite3.Error:
+                    # Try again at the next interval, e.g. when the database was busy
+                    pass
+
+        self._checkpoint_thread = threading.Thread(target=checkpoint_loop, daemon=True)
+        self._checkpoint_thread.start()
+
+    def close(self):
+        """Stop background checkpoints, commit and close the database"""
+        self._checkpoint_stop.set()
+        if self._checkpoint_thread is not None:
+            self._checkpoint_thread.join()
+            self._checkpoint_thread = None
+        with self._lock:
+            self.checkpoint()
+            self._conn.close()
+
+
+# Words kept lower case inside titles, unless they start the title
+TITLE_SMALL_WORDS = frozenset(["a", "an", "and", "as", "at", "by", "de", "for", "from", "in", "into", "of",
+                               "on", "or", "the", "to", "upon", "via", "von", "with"])
+
+
+def title_candidates(subject):
+    """Likely Wikipedia titles for a subject, best guess first"""
+    words = subject.strip().split()
+    if not words:
+        return []
+
+    # Keep words the user already cased (iPhone, NASA), title-case the rest except small words
+    smart = []
+    for position, word in enumerate(words):
+        if word != word.lower():
+            smart.append(word)
+        elif position and word in TITLE_SMALL_WORDS:
+            smart.append(word)
+        else:
+            smart.append(word[:1].upper() + word[1:])
+
+    sentence = " ".join(words)
+    candidates = [" ".join(smart), sentence[:1].upper() + sentence[1:], sentence.title()]
+    return list(dict.fromkeys(candidates))
+
+
+class SuggestionEngine:
+    """
+    Local "did you mean" engine over known titles. Titles are indexed by
+    their character trigrams; a lookup counts shared trigrams from the
+    rarest postings up to a fixed budget, so trigrams common to thousands of
+    titles ("list of", "episodes") cost nothing and the distinctive middle
+    of a title decides the ranking. At most max_checks of the best ranked
+    titles are verified with a full edit distance.
+
+    A few edits can destroy every trigram of a short title, so titles of up
+    to short_length characters are also indexed by their deletion variants
+    (SymSpell style), which finds them exactly.
+    """
+
+    def __init__(self, max_distance=2, max_titles=50000, max_checks=32, max_postings=5000, short_length=8,
+                 resolve=None):
+        self.max_distance = max_distance
+        self.max_titles = max_titles
+        self.max_checks = max_checks
+        self.max_postings = max_postings
+        self.short_length = short_length
+        self._resolve = resolve  # key -> display title, for titles added without one
+        self._titles = {}  # normalized title -> display title or None
+        self._postings = {}  # trigram -> normalized titles containing it
+        self._short_deletes = {}  # deletion variant of a short title -> normalized titles
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _grams(text):
+        """Set of padded character trigrams of text"""
+        padded = f"\x02{text}\x03"
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def _variants(self, text):
+        """Every string reachable from text by up to max_distance deletions"""
+        variants = {text}
+        frontier = {text}
+        for _ in range(self.max_distance):
+            frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+            variants |= frontier
+        return variants
+
+    def add(self, title, key=None):
+        """Make a title available for suggestions"""
+        key = key or normalize_subject(title)
+        with self._lock:
+            if key in self._titles:
+                if title and self._titles[key] is None:
+                    self._titles[key] = title
+                return
+            if len(self._titles) >= self.max_titles:
+                return
+            self._titles[key] = title
+            for gram in self._grams(key):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    self._postings[gram] = [key]
+                else:
+                    posting.append(key)
+            if len(key) <= self.short_length:
+                for variant in self._variants(key):
+                    self._short_deletes.setdefault(variant, []).append(key)
+
+    def add_many(self, titles):
+        """Add every title from an iterable"""
+        for title in titles:
+            self.add(title)
+
+    def __len__(self):
+        return len(self._titles)
+
+    def title(self, key):
+        """Display title for a normalized key"""
+        title = self._titles.get(key)
+        if title is None and self._resolve is not None:
+            title = self._resolve(key)
+        return title or key
+
+    def exact(self, subject):
+        """The known title matching subject up to case and spacing, or None"""
+        key = normalize_subject(subject)
+        return self.title(key) if key in self._titles else None
+
+    @staticmethod
+    def distance(a, b, limit):
+        """Optimal string alignment distance, or limit + 1 once it is exceeded"""
+        if abs(len(a) - len(b)) > limit:
+            return limit + 1
+
+        # Shared prefixes and suffixes never add edits, only compare what differs
+        start = 0
+        for x, y in zip(a, b):
+            if x != y:
+                break
+            start += 1
+        end = 0
+        for x, y in zip(reversed(a[start:]), reversed(b[start:])):
+            if x != y:
+                break
+            end += 1
+        a, b = a[start:len(a) - end], b[start:len(b) - end]
+        if not a or not b:
+            return min(max(len(a), len(b)), limit + 1)
+
+        # Cells more than limit off the diagonal always exceed limit, so only the band is computed
+        beyond = limit + 1
+        previous_previous = None
+        previous = [min(j, beyond) for j in range(len(b) + 1)]
+        for i in range(1, len(a) + 1):
+            current = [min(i, beyond)] + [beyond] * len(b)
+            low, high = max(1, i - limit), min(len(b), i + limit)
+            char = a[i - 1]
+            for j in range(low, high + 1):
+                cell = previous[j - 1] + (char != b[j - 1])
+                if previous[j] < cell:
+                    cell = previous[j] + 1
+                if current[j - 1] < cell:
+                    cell = current[j - 1] + 1
+                if (i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1]
+                        and previous_previous[j - 2] < cell):
+                    cell = previous_previous[j - 2] + 1
+                current[j] = cell
+            if current[0] > limit and min(current[low:high + 1]) > limit:
+                return beyond
+            previous_previous, previous = previous, current
+        return min(previous[-1], beyond)
+
+    def lookup(self, subject, limit=5):
+        """Known titles within max_distance edits of subject, closest first"""
+        key = normalize_subject(subject)
+        with self._lock:
+            exact = key in self._titles
+            postings = sorted(filter(None, map(self._postings.get, self._grams(key))), key=len)
+
+            # Count shared trigrams rarest first; once the budget is spent the common ones are skipped.
+            # The rarest trigram is always counted, truncated if it alone exceeds the budget
+            counts = Counter()
+            budget = self.max_postings
+            for posting in postings:
+                if len(posting) > budget and counts:
+                    break
+                counts.update(posting[:budget])
+                budget -= min(len(posting), budget)
+
+            # Short titles within reach share a deletion variant with the subject, the closest share the most
+            short = Counter()
+            if len(key) <= self.short_length + self.max_distance:
+                for variant in self._variants(key):
+                    short.update(self._short_deletes.get(variant, ()))
+
+        # Short matches and the titles sharing the most trigrams get the exact check
+        candidates = [candidate for candidate, _ in short.most_common(self.max_checks)]
+        candidates.extend(candidate for candidate, _ in counts.most_common(self.max_checks)
+                          if candidate not in short)
+        # Nothing but the exact title beats one edit, so stop once limit of those are found
+        scored = [(0, key)] if exact else []
+        closest = len(scored)
+        for candidate in candidates:
+            if closest >= limit:
+                break
+            if candidate == key or abs(len(candidate) - len(key)) > self.max_distance:
+                continue
+            distance = self.distance(key, candidate, self.max_distance)
+            if distance <= self.max_distance:
+                scored.append((distance, candidate))
+                closest += distance <= 1
+        scored.sort()
+        return [self.title(candidate) for _, candidate in scored[:limit]]
+
+
+class SingleFlight:
+    """
+    Registry of in-flight calls keyed by a string. The first caller for a key
+    runs the call; callers arriving while it is in flight wait for the same
+    result or exception instead of repeating the work.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, function, *args, timeout=None):
+        """
+        Run function(*args) unless a call for key is already in flight, in which
+        case wait up to timeout seconds for its outcome. Waiting callers get
+        TimeoutError on timeout and CancelledError if the call is cancelled,
+        each with a message naming the key.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            # exception() only raises for the wait itself, the call's own errors are re-raised below
+            try:
+                exception = future.exception(timeout)
+            except FutureTimeoutError:
+                raise FutureTimeoutError(f"timed out after {timeout} s waiting for an in-flight lookup of "
+                                         f"'{key}'") from None
+            except CancelledError:
+                raise CancelledError(f"the in-flight lookup of '{key}' was cancelled") from None
+            if exception is not None:
+                raise exception
+            return future.result()
+
+        try:
+            result = function(*args)
+        except BaseException as e:
+            self._settle(future, exception=e)
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+        self._settle(future, result=result)
+        return result
+
+    @staticmethod
+    def _settle(future, result=None, exception=None):
+        """Publish the outcome to waiting callers unless the call was cancelled"""
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def pending(self, key):
+        """Future for the call in flight for key, or None"""
+        with self._lock:
+            return self._calls.get(key)
+
+    def cancel(self, key):
+        """
+        Release the callers waiting on key with CancelledError and forget the
+        call, so the next caller starts a fresh one. The running call itself
+        finishes for its own caller.
+        """
+        with self._lock:
+            future = self._calls.pop(key, None)
+        return future is not None and future.cancel()
+
+    def __len__(self):
+        return len(self._calls)
+
+
+class HedgedLookup:
+    """
+    Races candidate calls on a shared thread pool and keeps the first result
+    that is accepted. Candidates start every delay seconds in priority order
+    until one wins (all at once when delay is 0). Queued candidates are then
+    cancelled, and running ones see their cancelled event set so they can
+    skip the upstream call. Wins are counted per candidate label.
+    """
+
+    def __init__(self, workers=8, delay=0.0):
+        self.workers = workers
+        self.delay = delay
+        self._executor = None
+        self._lock = threading.Lock()
+        self.races = 0
+        self.misses = 0
+        self.wins = {}
+
+    @property
+    def executor(self):
+        """Thread pool running the candidates, created on first race"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="horizon-hedge")
+        return self._executor
+
+    def race(self, candidates, accept):
+        """
+        Run (label, function, args) candidates as function(cancelled, *args)
+        and return (label, result) for the first result accept() takes. Returns
+        (None, None) when no candidate wins, or raises the first error when
+        every candidate failed.
+        """
+        with self._lock:
+            self.races += 1
+        cancelled = threading.Event()
+        waiting = deque(candidates)
+        running = {}
+        errors = []
+
+        try:
+            while waiting or running:
+                # Launch the next candidate, or all of them when not staggering
+                for _ in range(len(waiting) if self.delay <= 0 else min(1, len(waiting))):
+                    label, function, args = waiting.popleft()
+                    running[self.executor.submit(function, cancelled, *args)] = label
+
+                done, _ = wait(running, timeout=self.delay if waiting and self.delay > 0 else None,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    label = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    if accept(result):
+                        with self._lock:
+                            self.wins[label] = self.wins.get(label, 0) + 1
+                        return label, result
+        finally:
+            cancelled.set()
+            for future in running:
+                future.cancel()
+
+        with self._lock:
+            self.misses += 1
+        if errors and len(errors) == len(candidates):
+            raise errors[0]
+        return None, None
+
+    def stats(self):
+        """Race counts and the share of races each candidate label won"""
+        with self._lock:
+            return {
+                "races": self.races,
+                "misses": self.misses,
+                "wins": dict(sorted(self.wins.items(), key=lambda item: -item[1])),
+                "win_rates": {label: count / self.races for label, count in self.wins.items()},
+            }
+
+    def close(self):
+        """Stop the thread pool once running candidates finish"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+class Prefetcher:
+    """
+    Background fetcher that warms the knowledge base and result cache with
+    pages the user is likely to ask about next. Work waits in a bounded
+    queue; when the conversation moves to an unrelated topic everything still
+    queued for the old one is cancelled.
+    """
+
+    def __init__(self, fetch, workers=2, max_pending=16, remembered=256, topic_window=10):
+        self._fetch = fetch
+        self.workers = workers
+        self.remembered = remembered
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._generation = 0
+        self._topic = deque(maxlen=topic_window)  # normalized subjects of the latest turns on the topic
+        self._pending = set()  # normalized subjects queued or in flight
+        self._warmed = OrderedDict()  # normalized subjects prefetched but not asked about yet
+
+        self.scheduled = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.cancelled = 0
+        self.hits = 0
+
+    def _start(self):
+        """Start the worker threads on first use"""
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def retarget(self, subjects):
+        """
+        Cancel queued work when none of subjects was mentioned among the
+        latest topic_window subjects of the current topic
+        """
+        topic = list(dict.fromkeys(normalize_subject(subject) for subject in subjects))
+        with self._lock:
+            if not topic or any(key in self._topic for key in topic):
+                self._topic.extend(topic)
+                return
+            self._topic.clear()
+            self._topic.extend(topic)
+        self.cancel()
+
+    def cancel(self):
+        """Drop everything still queued; fetches already running are left to finish"""
+        with self._lock:
+            self._generation += 1
+        while True:
+            try:
+                _, key, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._pending.discard(key)
+                self.cancelled += 1
+
+    def submit(self, subjects, limit=None):
+        """
+        Queue subjects for prefetching, at most limit new ones, dropping them
+        when the queue is full
+        """
+        queued = 0
+        for subject in subjects:
+            if limit is not None and queued >= limit:
+                break
+            key = normalize_subject(subject)
+            with self._lock:
+                if not key or key in self._pending or key in self._warmed:
+                    continue
+                if not self._threads:
+                    self._start()
+                try:
+                    self._queue.put_nowait((self._generation, key, subject))
+                except queue.Full:
+                    self.dropped += 1
+                    continue
+                self._pending.add(key)
+                self.scheduled += 1
+                queued += 1
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            generation, key, subject = item
+            if generation != self._generation:
+                with self._lock:
+                    self._pending.discard(key)
+                    self.cancelled += 1
+                continue
+
+            try:
+                self._fetch(subject)
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+            else:
+                with self._lock:
+                    self.completed += 1
+                    self._warmed[key] = True
+                    while len(self._warmed) > self.remembered:
+                        self._warmed.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+    def claim(self, subject):
+        """Record whether a lookup for subject was answered by a prefetch"""
+        with self._lock:
+            if self._warmed.pop(normalize_subject(subject), None):
+                self.hits += 1
+                return True
+            return False
+
+    def stats(self):
+        """Prefetch counters and the share of prefetched pages that were used"""
+        with self._lock:
+            return {
+                "scheduled": self.scheduled,
+                "completed": self.completed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "cancelled": self.cancelled,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.completed if self.completed else 0.0
+            }
+
+    def close(self):
+        """Cancel queued work and stop the worker threads"""
+        self.cancel()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+class PatternStore:
+    """
+    Bounded n-gram frequency store. Keys are tuples of interned words. When the
+    store outgrows its capacity the least frequent n-grams are pruned, and the
+    top-k n-grams are tracked on every update so reading them never sorts the
+    whole store.
+    """
+
+    def __init__(self, capacity=10000, top_k=5):
+        self.capacity = capacity
+        self.top_k = top_k
+        self._counts = {}
+        self._top = {}  # the top_k most frequent keys and their counts
+
+    @staticmethod
+    def _key(ngram):
+        """Normalize a string or sequence n-gram to the tuple key used internally"""
+        return tuple(ngram.split()) if isinstance(ngram, str) else tuple(ngram)
+
+    def add(self, key):
+        """Count one occurrence of an n-gram tuple"""
+        count = self._counts.get(key, 0) + 1
+        self._counts[key] = count
+
+        top = self._top
+        if key in top or len(top) < self.top_k:
+            top[key] = count
+        else:
+            weakest = min(top, key=top.get)
+            if count > top[weakest]:
+                del top[weakest]
+                top[key] = count
+
+        if len(self._counts) > self.capacity:
+            self._prune()
+
+    def _prune(self):
+        """Keep only the most frequent three quarters of the capacity"""
+        keep = max(self.top_k, self.capacity * 3 // 4)
+        survivors = heapq.nlargest(keep, self._counts.items(), key=lambda item: item[1])
+        self._counts = dict(survivors)
+        self._counts.update(self._top)
+
+    def most_common(self, n=None):
+        """Return up to n (pattern, count) pairs, most frequent first"""
+        ranked = sorted(self._top.items(), key=lambda item: item[1], reverse=True)
+        return [(" ".join(key), count) for key, count in ranked[:n]]
+
+    def get(self, ngram, default=None):
+        """Count for an n-gram given as a tuple or a space separated string"""
+        return self._counts.get(self._key(ngram), default)
+
+    def __getitem__(self, ngram):
+        return self._counts[self._key(ngram)]
+
+    def __contains__(self, ngram):
+        return self._key(ngram) in self._counts
+
+    def __len__(self):
+        return len(self._counts)
+
+
+class SimilarityIndex:
+    """
+    Character-trigram inverted index over past user inputs. A lookup gathers
+    candidates from the query's rarest trigrams up to a fixed budget of
+    postings, so trigrams shared by most of the conversation ("what is",
+    "the") cost nothing once the budget is spent. Candidates of a length that
+    could reach the threshold are ranked by trigram similarity and only the
+    best max_candidates get the exact SequenceMatcher ratio, so its cost stays
+    flat as the conversation grows.
+    """
+
+    def __init__(self, gram_size=3, max_candidates=32, max_postings=2000):
+        self.gram_size = gram_size
+        self.max_candidates = max_candidates
+        self.max_postings = max_postings
+        self._keys_by_text = {}  # lowered text -> keys that share it, oldest first
+        self._text_by_key = {}
+        self._grams_by_text = {}
+        self._postings = {}  # trigram -> texts containing it
+
+    def _grams(self, text):
+        """Set of padded character n-grams of text"""
+        padded = f"\x02{text}\x03"
+        return frozenset(padded[i:i + self.gram_size] for i in range(len(padded) - self.gram_size + 1))
+
+    def add(self, key, text):
+        """Index text under key; keys must increase with conversation order"""
+        text = text.lower()
+        self._text_by_key[key] = text
+        keys = self._keys_by_text.get(text)
+        if keys is not None:
+            # Identical inputs share one posting, only the oldest key can ever win
+            keys.append(key)
+            return
+
+        self._keys_by_text[text] = [key]
+        grams = self._grams(text)
+        self._grams_by_text[text] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(text)
+
+    def remove(self, key):
+        """Forget the text indexed under key"""
+        text = self._text_by_key.pop(key, None)
+        if text is None:
+            return
+        keys = self._keys_by_text[text]
+        keys.remove(key)
+        if keys:
+            return
+
+        del self._keys_by_text[text]
+        for gram in self._grams_by_text.pop(text):
+            texts = self._postings[gram]
+            texts.discard(text)
+            if not texts:
+                del self._postings[gram]
+
+    @staticmethod
+    def _could_match(bound, threshold, best_ratio):
+        """Whether a candidate with this ratio upper bound can still be the best match"""
+        return bound > threshold and bound >= best_ratio
+
+    def best_match(self, text, threshold=0.7):
+        """Return (key, ratio) of the most similar indexed text above threshold, or None"""
+        query = text.lower()
+        grams = self._grams(query)
+
+        # ratio() is at most 2 * shorter / (both lengths), so far shorter or longer texts can never match
+        shortest = len(query) * threshold / (2 - threshold)
+        longest = len(query) * (2 - threshold) / threshold if threshold > 0 else math.inf
+
+        # Gather candidates from the rarest trigrams first; once the budget is spent the common ones are
+        # skipped. The rarest trigram is always used, truncated if it alone exceeds the budget
+        postings = sorted(filter(None, map(self._postings.get, grams)), key=len)
+        candidates = set()
+        budget = self.max_postings
+        for posting in postings:
+            if len(posting) > budget and candidates:
+                break
+            candidates.update(itertools.islice(posting, budget))
+            budget -= min(len(posting), budget)
+
+        # The candidates sharing the largest part of their trigrams with the query get the exact ratio
+        scores = {}
+        for candidate in candidates:
+            if shortest <= len(candidate) <= longest:
+                candidate_grams = self._grams_by_text[candidate]
+                scores[candidate] = 2 * len(grams & candidate_grams) / (len(grams) + len(candidate_grams))
+        if not scores:
+            return None
+        ranked = heapq.nlargest(self.max_candidates, scores, key=scores.get)
+
+        from difflib import SequenceMatcher
+        best = None
+        best_ratio = 0.0
+        matcher = SequenceMatcher(None, query)
+        for candidate in ranked:
+            matcher.set_seq2(candidate)
+            # Cheap upper bounds first, the exact ratio only when it could still win
+            if not self._could_match(matcher.real_quick_ratio(), threshold, best_ratio):
+                continue
+            if not self._could_match(matcher.quick_ratio(), threshold, best_ratio):
+                continue
+            ratio = matcher.ratio()
+            if ratio <= threshold:
+                continue
+            key = self._keys_by_text[candidate][0]
+            if best is None or ratio > best_ratio or (ratio == best_ratio and key < best):
+                best, best_ratio = key, ratio
+
+        return (best, best_ratio) if best is not None else None
+
+
+class Turn:
+    """One exchange of the conversation, stored compactly with an epoch timestamp"""
+
+    __slots__ = ("turn_id", "user_input", "ai_response", "timestamp")
+
+    def __init__(self, turn_id, user_input, ai_response=None, timestamp=None):
+        self.turn_id = turn_id
+        self.user_input = user_input
+        self.ai_response = ai_response
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    # Mapping-style access for code written against the old dict entries
+    def __getitem__(self, name):
+        value = getattr(self, name) if name in self.__slots__ else None
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, value):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def __contains__(self, name):
+        return name in self.__slots__ and getattr(self, name) is not None
+
+    def to_dict(self):
+        """Plain dict form used by the on-disk archive"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ConversationHistory:
+    """
+    Fixed-capacity ring buffer of recent turns. Turns pushed out of memory are
+    appended to an optional JSONL archive; the most recent archived turns stay
+    addressable by id so they can be paged back in lazily.
+    """
+
+    def __init__(self, capacity=200, archive_path=None, archive_index_size=5000):
+        self.capacity = capacity
+        self.archive_path = archive_path
+        self.archive_index_size = archive_index_size
+        self._turns = deque()
+        self._next_id = 0
+        self._archive = None
+        self._offsets = OrderedDict()  # turn id -> byte offset of archived turns
+
+    def append(self, user_input):
+        """Record a new user input and return its Turn"""
+        turn = Turn(self._next_id, user_input)
+        self._next_id += 1
+        self._turns.append(turn)
+        if len(self._turns) > self.capacity:
+            self._spill(self._turns.popleft())
+        return turn
+
+    def _spill(self, turn):
+        """Append a turn leaving memory to the archive"""
+        if self.archive_path is None:
+            return
+        if self._archive is None:
+            self._archive = open(self.archive_path, "ab")
+        offset = self._archive.tell()
+        self._archive.write(json.dumps(turn.to_dict()).encode("utf-8") + b"\n")
+        self._archive.flush()
+
+        self._offsets[turn.turn_id] = offset
+        while len(self._offsets) > self.archive_index_size:
+            self._offsets.popitem(last=False)
+
+    def get(self, turn_id):
+        """Return a turn by id from memory or the archive, or None if it is gone"""
+        if self._turns and turn_id >= self._turns[0].turn_id:
+            index = turn_id - self._turns[0].turn_id
+            return self._turns[index] if index < len(self._turns) else None
+
+        offset = self._offsets.get(turn_id)
+        if offset is None:
+            return None
+        with open(self.archive_path, "rb") as f:
+            f.seek(offset)
+            return Turn(**json.loads(f.readline()))
+
+    @property
+    def total(self):
+        """Number of turns recorded, including archived ones"""
+        return self._next_id
+
+    def close(self):
+        """Close the archive file"""
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+    def __getitem__(self, index):
+        return self._turns[index]
+
+    def __iter__(self):
+        return iter(self._turns)
+
+    def __len__(self):
+        return len(self._turns)
+
+
+# Question phrases in priority order with the character that ends their subject.
+# When several phrases occur in one question the earliest entry here wins.
+QUESTION_PATTERNS = (
+    ("who is", "?"),
+    ("who are", "?"),
+    ("who was", "?"),
+    ("who were", "?"),
+    ("what is", "?"),
+    ("what are", "?"),
+    ("what was", "?"),
+    ("what were", "?"),
+    ("where is", "?"),
+    ("where are", "?"),
+    ("when did", "?"),
+    ("when was", "?"),
+    ("tell me about", "."),
+    ("information on", "."),
+    ("explain", ".")
+)
+
+QUESTION_WORDS = frozenset(["who", "what", "where", "when", "why", "how"])
+SUBJECT_STOP_WORDS = frozenset(["is", "are", "was", "were", "the", "a", "an", "in", "on", "at"])
+ENTITY_STOP_WORDS = frozenset(["I", "You", "He", "She", "They", "We", "It", "What", "Who", "How",
+                               "Why", "When", "Where", "Is", "Are", "The", "A", "An", "This", "That"])
+
+CAPITALIZED_WORD_RE = re.compile(r'\b[A-Z][a-z]+\b')
+CAPITALIZED_PHRASE_RE = re.compile(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b')
+QUOTED_TERM_RE = re.compile(r'"([^"]*)"')
+# Where a sentence starts: the start of the text, or after sentence punctuation or a line break
+SENTENCE_START_RE = re.compile(r'(?:^|[.!?]\s+|\n\s*)["\'(]*')
+
+# Entities of one turn that are fetched ahead, each one costs upstream requests
+PREFETCH_PER_TURN = 2
+
+
+# Default sentiment lexicon, matched against whole tokens rather than substrings
+SENTIMENT_PATTERNS = {
+    "positive": (
+        "happy", "good", "great", "excellent", "wonderful", "amazing", "love", "enjoy", "appreciate",
+        "fantastic", "terrific", "awesome", "superb", "delighted", "pleased", "thrilled", "excited",
+        "impressed", "thankful", "grateful", "satisfied", "perfect", "best", "better", "brilliant"
+    ),
+    "negative": (
+        "sad", "bad", "terrible", "awful", "horrible", "hate", "dislike", "disappointed", "upset",
+        "angry", "annoyed", "frustrated", "irritated", "unhappy", "depressed", "worried", "concerned",
+        "worst", "worse", "poor", "unfortunate", "disappointing", "disastrous", "miserable"
+    ),
+    "neutral": (
+        "okay", "fine", "alright", "so-so", "average", "moderate", "adequate", "acceptable",
+        "fair", "reasonable", "standard", "ordinary", "common", "regular", "normal", "typical"
+    )
+}
+
+# Tokens that flip the polarity of the sentiment words following them ("n't" contractions included)
+NEGATIONS = frozenset(["not", "no", "never", "neither", "nor", "hardly", "barely", "cannot"])
+
+SENTIMENT_TOKEN_RE = re.compile(r"[a-z]+(?:[-'][a-z]+)*|[.,;:!?]")
+
+
+class SentimentLexicon:
+    """
+    Frozen token -> sentiment index. Text is tokenized once and each token is
+    looked up directly, so scoring cost follows the input length. A negation
+    flips positive and negative words for the next few tokens of its clause.
+    """
+
+    def __init__(self, patterns=SENTIMENT_PATTERNS, negations=NEGATIONS, negation_scope=3):
+        self.patterns = {label: tuple(words) for label, words in patterns.items()}
+        self.negations = frozenset(negations)
+        self.negation_scope = negation_scope
+        self._index = {word.lower(): label for label, words in self.patterns.items() for word in words}
+
+    @classmethod
+    def load(cls, path):
+        """Load a lexicon from a JSON file of {label: [words]} plus optional "negations" """
+        with open(path, "r") as f:
+            data = json.load(f)
+        negations = data.pop("negations", NEGATIONS)
+        negation_scope = data.pop("negation_scope", 3)
+        return cls(data, negations, negation_scope)
+
+    def label(self, token):
+        """Sentiment label of a lowercase token, or None"""
+        return self._index.get(token)
+
+    def is_negation(self, token):
+        """Whether token negates what follows it"""
+        return token in self.negations or token.endswith("n't")
+
+    def score(self, text):
+        """Count sentiment words per label in a single tokenization pass"""
+        scores = {label: 0 for label in self.patterns}
+        flipped = {"positive": "negative", "negative": "positive"}
+        negated_until = -1
+
+        tokens = SENTIMENT_TOKEN_RE.findall(text.lower().replace("\u2019", "'"))
+        for position, token in enumerate(tokens):
+            if self.is_negation(token):
+                negated_until = position + self.negation_scope
+                continue
+            if not token[0].isalpha():
+                # Punctuation closes the clause and with it any negation scope
+                negated_until = -1
+                continue
+
+            label = self._index.get(token)
+            if label is None:
+                continue
+            if position <= negated_until:
+                label = flipped.get(label, label)
+            scores[label] += 1
+
+        return scores
+
+
+class SubjectExtractor:
+    """
+    Precompiled question-subject extractor. One alternation over every trigger
+    phrase finds all candidates in a single scan of the question; only the
+    highest priority trigger found is then resolved with its own pattern.
+    """
+
+    def __init__(self, patterns=QUESTION_PATTERNS):
+        self._priority = {}
+        self._subject_patterns = []
+        for index, (trigger, terminator) in enumerate(patterns):
+            self._priority[trigger + " "] = index
+            self._subject_patterns.append(
+                re.compile(re.escape(trigger) + r" (.*?)(?:" + re.escape(terminator) + r"|$)"))
+
+        # No trigger can start inside another, so non-overlapping scanning sees every occurrence
+        self._scanner = re.compile("|".join(re.escape(trigger) for trigger in self._priority))
+
+    def extract(self, question):
+        """Return the subject following the highest priority trigger, or None"""
+        first_seen = {}
+        for match in self._scanner.finditer(question):
+            index = self._priority[match.group()]
+            if index not in first_seen:
+                first_seen[index] = match.start()
+
+        for index in sorted(first_seen):
+            match = self._subject_patterns[index].search(question, first_seen[index])
+            if match:
+                return match.group(1).strip()
+        return None
+
+
+# Returned instead of a stage timer while tracing is off, so disabled tracing costs one check
+NULL_STAGE = nullcontext()
+
+# Percentiles kept for every traced stage
+TRACE_QUANTILES = (0.5, 0.95, 0.99)
+
 
-# Initialize colorama for cross-platform colored terminal output
-init()
+class StageTimer:
+    """Context manager adding the wall-clock time of a block to a trace stage"""
+
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.trace.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Trace:
+    """
+    Per-stage timings and event counts for one response. Stages may nest,
+    so "lookup" includes "wiki_page" and "search"; repeated stages add up.
+    """
+
+    __slots__ = ("started_at", "_start", "stages", "events")
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.events = {}
+
+    def stage(self, name):
+        """Time a block as the named stage"""
+        return StageTimer(self, name)
+
+    def add(self, name, seconds):
+        """Add seconds to a stage"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def mark(self, name):
+        """Record the time elapsed since the trace started as a stage"""
+        self.stages[name] = time.perf_counter() - self._start
+
+    def count(self, name, amount=1):
+        """Count an event such as a cache hit or a network call"""
+        self.events[name] = self.events.get(name, 0) + amount
+
+    def to_dict(self):
+        return {
+            "started_at": self.started_at,
+            "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            "events": dict(self.events),
+        }
+
+
+class LatencyRecorder:
+    """
+    Rolling per-stage latency histograms fed by response traces. Percentiles
+    cover the last window samples of each stage, while counts, sums and
+    event totals are cumulative. Traces can also be appended to a JSON lines log.
+    """
+
+    def __init__(self, window=1024, log_path=None):
+        self.window = window
+        self.log_path = log_path
+        self.responses = 0
+        self._samples = {}
+        self._counts = {}
+        self._sums = {}
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def record(self, trace):
+        """Add a finished trace to the histograms and the log"""
+        with self._lock:
+            self.responses += 1
+            for name, seconds in trace.stages.items():
+                samples = self._samples.get(name)
+                if samples is None:
+                    samples = self._samples[name] = deque(maxlen=self.window)
+                samples.append(seconds)
+                self._counts[name] = self._counts.get(name, 0) + 1
+                self._sums[name] = self._sums.get(name, 0.0) + seconds
+            for name, amount in trace.events.items():
+                self._events[name] = self._events.get(name, 0) + amount
+
+            if self.log_path:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace.to_dict()) + "\n")
+
+    def percentiles(self, name):
+        """Nearest-rank percentiles in seconds for a stage, or None if it has no samples"""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples:
+            return None
+        return {q: samples[max(0, math.ceil(q * len(samples)) - 1)] for q in TRACE_QUANTILES}
+
+    def summary(self):
+        """Percentiles in milliseconds per stage, with cumulative counts and event totals"""
+        stages = {}
+        for name in sorted(self._samples):
+            percentiles = self.percentiles(name)
+            stages[name] = {f"p{round(q * 100)}": round(value * 1000, 3) for q, value in percentiles.items()}
+            stages[name]["count"] = self._counts[name]
+        return {"responses": self.responses, "stages": stages, "events": dict(self._events)}
+
+    def prometheus(self):
+        """Render the histograms and event totals in the Prometheus text format"""
+        lines = [
+            "# HELP horizon_stage_seconds Time spent in each stage of a response.",
+            "# TYPE horizon_stage_seconds summary",
+        ]
+        for name in sorted(self._samples):
+            for q, value in self.percentiles(name).items():
+                lines.append(f'horizon_stage_seconds{{stage="{name}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'horizon_stage_seconds_sum{{stage="{name}"}} {self._sums[name]:.6f}')
+            lines.append(f'horizon_stage_seconds_count{{stage="{name}"}} {self._counts[name]}')
+
+        lines.append("# HELP horizon_events_total Cache hits, misses and network calls.")
+        lines.append("# TYPE horizon_events_total counter")
+        for name in sorted(self._events):
+            lines.append(f'horizon_events_total{{event="{name}"}} {self._events[name]}')
+
+        lines.append("# HELP horizon_responses_total Responses traced.")
+        lines.append("# TYPE horizon_responses_total counter")
+        lines.append(f"horizon_responses_total {self.responses}")
+        return "\n".join(lines) + "\n"
 
 
 class HorizonAI:
@@ -22,86 +1487,304 @@ class HorizonAI:
     comprehensive understanding, and seamless Wikipedia integration.
     """
 
-    def __init__(self):
-        self.name = "HorizonAI"
-        self.version = "1.4 Nexus"
-        self.conversation_history = []
+    # Built once at class load and shared by every instance
+    subject_extractor = SubjectExtractor()
+    default_sentiment_lexicon = SentimentLexicon()
+
+    def __init__(self, mode="animated", cache_path="horizon_cache.json", cache_size=2048, cache_ttl=86400,
+                 api_url=WIKIPEDIA_API_URL, pool_size=10, timeout=(3.05, 10.0), max_retries=3,
+                 sentiment_lexicon=None, pattern_capacity=10000, history_size=200, history_archive=None,
+                 history_search_window=5000, knowledge_path="horizon_knowledge.db", checkpoint_interval=30.0,
+                 knowledge_max_age=30 * 86400, offline_index=None, live_lookups=True, suggestion_titles=None,
+                 prefetch=False, tracing=False, trace_window=1024, trace_log=None, rate_limiter=None,
+                 coalesce_timeout=None, languages=("en",), hedge=False, hedge_delay=0.0):
+        if mode not in RESPONSE_MODES:
+            raise ValueError(f"Unknown response mode '{mode}', expected one of {', '.join(RESPONSE_MODES)}")
+
+        init_start = time.perf_counter()
+        self._parent = None
+        self.init_conversation(mode, pattern_capacity, history_size, history_archive, history_search_window)
         self.knowledge_base = {}
-        self.pattern_database = {}
-        self.sentiment_patterns = {
-            "positive": ["happy", "good", "great", "excellent", "wonderful", "amazing", "love", "enjoy", "appreciate"],
-            "negative": ["sad", "bad", "terrible", "awful", "horrible", "hate", "dislike", "disappointed", "upset"],
-            "neutral": ["okay", "fine", "alright", "so-so", "average"]
-        }
-
-        # Initialize Wikipedia API with English language
-        self.wiki = wikipediaapi.Wikipedia(
-            language='en',
-            extract_format=wikipediaapi.ExtractFormat.WIKI,
-            user_agent='HorizonAI/1.4 (https://horizon-ai.example.com; info@horizon-ai.example.com)'
-        )
 
-        # Load existing knowledge base
+        # Sentiment lexicon: the shared default, a SentimentLexicon or a path to a JSON lexicon file
+        if sentiment_lexicon is None:
+            sentiment_lexicon = self.default_sentiment_lexicon
+        elif not isinstance(sentiment_lexicon, SentimentLexicon):
+            sentiment_lexicon = SentimentLexicon.load(sentiment_lexicon)
+        self.sentiment_lexicon = sentiment_lexicon
+        self.sentiment_patterns = sentiment_lexicon.patterns
+
+        # Shared connection pool for all Wikipedia traffic
+        self.api_url = api_url
+        self.http = HTTPClient(pool_size=pool_size, timeout=timeout, max_retries=max_retries)
+
+        # Optional limiter with an acquire() method, called before every upstream call
+        self.rate_limiter = rate_limiter
+
+        # Concurrent lookups of the same subject share one upstream fetch; followers
+        # give up after coalesce_timeout seconds (None waits for the fetch)
+        self.inflight = SingleFlight()
+        self.coalesce_timeout = coalesce_timeout
+
+        # One Wikipedia client per language edition, each created on first use; the first
+        # language is the default edition, see the wiki property
+        self.languages = tuple(languages)
+        self._wiki_clients = {}
+        self._wiki_lock = threading.Lock()
+
+        # Hedged lookups race title variants across every language edition, staggered
+        # by hedge_delay seconds; the first page found wins
+        self.hedged_lookups = HedgedLookup(workers=pool_size, delay=hedge_delay) if hedge else None
+
+        # Load existing knowledge base; None keeps it in memory only
+        self.knowledge_path = knowledge_path
         self.load_knowledge_base()
+        if isinstance(self.knowledge_base, KnowledgeStore) and checkpoint_interval:
+            self.knowledge_base.start_checkpoints(checkpoint_interval)
+
+        # Retrieved pages older than this (in seconds) are fetched again
+        self.knowledge_max_age = knowledge_max_age
+
+        # Offline summary index built by dump_index.py; live lookups are only a fallback
+        self.offline_index = None
+        if offline_index is not None:
+            from dump_index import SummaryIndex
+            self.offline_index = SummaryIndex(offline_index, key=normalize_subject)
+        self.live_lookups = live_lookups
+
+        # Local "did you mean" engine, seeded on first use from everything already known
+        self.suggestion_titles = suggestion_titles
+        self._suggestions = None
+        self._suggestions_lock = threading.Lock()
+        self._suggestions_thread = None
+        self._suggestions_stop = threading.Event()
+
+        # Speculatively fetch entities and suggestions the user may ask about next
+        self.prefetcher = Prefetcher(self.prefetch_page) if prefetch else None
+
+        # Cache Wikipedia lookups; failed lookups are kept for a shorter time
+        self.cache = ResultCache(cache_path, max_entries=cache_size, ttl=cache_ttl)
+        self.negative_cache_ttl = min(cache_ttl, 600)
+
+        # Per-response traces feed rolling latency histograms; off by default
+        self.tracing = tracing or trace_log is not None
+        self.latency = LatencyRecorder(window=trace_window, log_path=trace_log)
+
+        # Greeting the user - headless instances skip straight to work
+        if mode == "animated":
+            self.display_startup_animation()
+        elif mode == "fast":
+            self.display_banner()
+
+        # Seconds spent constructing this instance, including the greeting
+        self.init_time = time.perf_counter() - init_start
+
+    def init_conversation(self, mode, pattern_capacity, history_size, history_archive, history_search_window):
+        """Set up the state that belongs to a single conversation"""
+        self.mode = mode
+        self.verbose = mode != "headless"
+        self._thread_state = threading.local()
+
+        self.name = "HorizonAI"
+        self.version = "1.4 Nexus"
+        self.pattern_database = PatternStore(capacity=pattern_capacity)
+
+        # Recent turns live in memory; older ones spill to the archive when one is configured
+        self.conversation_history = ConversationHistory(
+            capacity=history_size, archive_path=history_archive, archive_index_size=history_search_window)
+        self.similarity_index = SimilarityIndex()
+        self.similarity_window = history_search_window if history_archive else history_size
 
         # Set up conversation context tracking
         self.conversation_context = {
             "topic": None,
-            "entities": [],
+            "entities": deque(maxlen=10),
             "sentiment": "neutral",
-            "recent_queries": []
+            "recent_queries": deque(maxlen=5)
         }
 
         # Animation settings
         self.animation_speed = 0.02
         self.animation_active = False
+        self._animation_thread = None
+        self._animation_stop = threading.Event()
+        # Held for every write of the spinner and of status lines, so neither lands mid-line in the other
+        self._output_lock = threading.Lock()
+
+        # Wall-clock duration of the most recent Wikipedia lookup, in seconds
+        self.last_lookup_time = None
+
+        # Trace of the response in progress and of the last finished response
+        self.trace = None
+        self.last_trace = None
+
+    # Resources a session shares with the instance that created it
+    SHARED_ATTRIBUTES = ("sentiment_lexicon", "sentiment_patterns", "api_url", "http", "knowledge_path",
+                         "knowledge_base", "knowledge_max_age", "offline_index", "live_lookups",
+                         "suggestion_titles", "cache", "negative_cache_ttl", "tracing", "latency", "rate_limiter", "inflight", "coalesce_timeout",
+                         "languages", "hedged_lookups")
+
+    def new_session(self, history_size=50, pattern_capacity=1000):
+        """
+        Create a lightweight headless conversation with its own history and
+        context that shares this instance's connection pool, caches, knowledge
+        base and lookup indexes.
+        """
+        session = object.__new__(type(self))
+        init_start = time.perf_counter()
+        session._parent = self
+        session.init_conversation("headless", pattern_capacity, history_size, None, history_size)
+        for name in self.SHARED_ATTRIBUTES:
+            setattr(session, name, getattr(self, name))
+        session.prefetcher = None
+        session.init_time = time.perf_counter() - init_start
+        return session
+
+    @property
+    def wiki(self):
+        """Wikipedia API client for the default language edition, created lazily on first lookup"""
+        return self.wiki_client(self.languages[0])
+
+    @wiki.setter
+    def wiki(self, client):
+        self._wiki_clients[self.languages[0]] = client
+
+    def wiki_client(self, language):
+        """Wikipedia API client for a language edition, created lazily and shared by sessions"""
+        if self._parent is not None:
+            return self._parent.wiki_client(language)
+        client = self._wiki_clients.get(language)
+        if client is None:
+            with self._wiki_lock:
+                client = self._wiki_clients.get(language)
+                if client is None:
+                    client = self._wiki_clients[language] = self.make_wiki_client(language)
+        return client
+
+    def make_wiki_client(self, language="en"):
+        """Create a Wikipedia API client; override to point HorizonAI at another backend"""
+        import wikipediaapi
+        return wikipediaapi.Wikipedia(
+            language=language,
+            extract_format=wikipediaapi.ExtractFormat.WIKI,
+            user_agent=USER_AGENT,
+            timeout=self.http.timeout[1]
+        )
+
+    @property
+    def suggestions(self):
+        """
+        Local suggestion engine, created on first use. Seeding it can take
+        seconds for large title lists, so it runs in the background and
+        lookups meanwhile use the titles indexed so far.
+        """
+        if self._parent is not None:
+            return self._parent.suggestions
+        if self._suggestions is None:
+            with self._suggestions_lock:
+                if self._suggestions is None:
+                    engine = SuggestionEngine(resolve=self.known_title)
+                    self._suggestions_thread = threading.Thread(target=self.seed_suggestion_engine, args=(engine,),
+                                                                daemon=True)
+                    self._suggestions_thread.start()
+                    self._suggestions = engine
+        return self._suggestions
+
+    def seed_suggestion_engine(self, engine):
+        """Fill a suggestion engine from the knowledge base, result cache and title lists"""
+        stop = self._suggestions_stop
+        try:
+            if isinstance(self.knowledge_base, KnowledgeStore):
+                page_keys = self.knowledge_base.keys_with_prefix("wiki:")
+            else:
+                page_keys = [key for key in list(self.knowledge_base) if key.startswith("wiki:")]
+            for key in page_keys:
+                if stop.is_set():
+                    return
+                engine.add(None, key=key[len("wiki:"):])
+
+            for value in self.cache.values():
+                if stop.is_set():
+                    return
+                if isinstance(value, list):
+                    engine.add_many(value)
+                elif value.get("exists"):
+                    engine.add(value["title"])
+                else:
+                    engine.add_many(value.get("suggestions", ()))
+
+            if self.suggestion_titles:
+                with open(self.suggestion_titles, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if stop.is_set():
+                            return
+                        if line.strip():
+                            engine.add(line.strip())
+        except Exception as e:
+            self.status(f"Error loading suggestion titles: {e}", Fore.RED)
 
-        # Greeting the user
-        self.display_startup_animation()
+    def known_title(self, key):
+        """Display title of a page stored in the knowledge base under a normalized key"""
+        entry = self.knowledge_base.get("wiki:" + key)
+        return entry.get("title") if entry else None
+
+    def local_suggestions(self, query):
+        """Close known titles for a subject, without any network access"""
+        key = normalize_subject(query)
+        return [title for title in self.suggestions.lookup(query) if normalize_subject(title) != key]
 
     def load_knowledge_base(self):
-        """Load pre-existing knowledge or create a new knowledge base"""
+        """Open the knowledge base store, or create and seed a new one"""
         try:
-            if os.path.exists("horizon_knowledge.json"):
+            self.knowledge_base = KnowledgeStore(self.knowledge_path or ":memory:")
+            if not self.knowledge_base.is_empty():
+                self.status(f"Knowledge base opened: {self.knowledge_path}", Fore.CYAN)
+            elif self.knowledge_path and os.path.exists("horizon_knowledge.json"):
+                # One-time migration from the old whole-file JSON format
                 with open("horizon_knowledge.json", "r") as f:
-                    self.knowledge_base = json.load(f)
-                print(f"{Fore.CYAN}Knowledge base loaded: {len(self.knowledge_base)} entries{Style.RESET_ALL}")
+                    self.knowledge_base.update_many(json.load(f).items())
+                self.knowledge_base.checkpoint()
+                self.status(f"Knowledge base migrated: {len(self.knowledge_base)} entries", Fore.CYAN)
             else:
                 # Initialize with some basic knowledge
-                self.knowledge_base = {
-                    "self": {
-                        "name": "HorizonAI",
-                        "version": "1.4 Nexus",
-                        "created": datetime.now().strftime("%Y-%m-%d"),
-                        "capabilities": [
-                            "advanced conversation",
-                            "pattern recognition",
-                            "topic understanding",
-                            "Wikipedia integration",
-                            "adaptive learning"
-                        ]
-                    }
+                self.knowledge_base["self"] = {
+                    "name": "HorizonAI",
+                    "version": "1.4 Nexus",
+                    "created": datetime.now().strftime("%Y-%m-%d"),
+                    "capabilities": [
+                        "advanced conversation",
+                        "pattern recognition",
+                        "topic understanding",
+                        "Wikipedia integration",
+                        "adaptive learning"
+                    ]
                 }
-                print(f"{Fore.YELLOW}New knowledge base initialized{Style.RESET_ALL}")
+                self.knowledge_base.checkpoint()
+                self.status("New knowledge base initialized", Fore.YELLOW)
         except Exception as e:
-            print(f"{Fore.RED}Error loading knowledge base: {e}{Style.RESET_ALL}")
+            self.status(f"Error loading knowledge base: {e}", Fore.RED)
             self.knowledge_base = {}
 
     def save_knowledge_base(self):
-        """Save the current knowledge base to a JSON file"""
+        """Commit pending knowledge base writes"""
+        if not isinstance(self.knowledge_base, KnowledgeStore):
+            return
         try:
-            with open("horizon_knowledge.json", "w") as f:
-                json.dump(self.knowledge_base, f, indent=2)
-            print(f"{Fore.GREEN}Knowledge base saved successfully{Style.RESET_ALL}")
+            self.knowledge_base.checkpoint()
+            self.status("Knowledge base saved successfully", Fore.GREEN)
         except Exception as e:
-            print(f"{Fore.RED}Error saving knowledge base: {e}{Style.RESET_ALL}")
+            self.status(f"Error saving knowledge base: {e}", Fore.RED)
 
-    def display_startup_animation(self):
-        """Display a cool startup animation for HorizonAI"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+    def save_cache(self):
+        """Persist the Wikipedia result cache so it survives restarts"""
+        try:
+            self.cache.save()
+        except Exception as e:
+            self.status(f"Error saving result cache: {e}", Fore.RED)
 
-        # ASCII art logo
-        logo = [
+    def startup_logo(self):
+        """ASCII art logo shown when HorizonAI starts"""
+        return [
             "  _    _               _                    _    ___ ",
             " | |  | |             (_)                  / |  / _ \\",
             " | |__| | ___  _ __ ___  ______  _ __    / /  | | | |",
@@ -113,8 +1796,19 @@ class HorizonAI:
             "                                                    "
         ]
 
+    def display_banner(self):
+        """Print the logo in a single write, without animation or clearing the screen"""
+        logo = "\n".join(self.startup_logo())
+        sys.stdout.write(f"{Fore.CYAN}{logo}{Style.RESET_ALL}\n")
+        sys.stdout.write(f"{Fore.CYAN}HorizonAI v{self.version} is now online and ready to assist you.{Style.RESET_ALL}\n\n")
+        sys.stdout.flush()
+
+    def display_startup_animation(self):
+        """Display a cool startup animation for HorizonAI"""
+        os.system('cls' if os.name == 'nt' else 'clear')
+
         # Animated typing effect for the logo
-        for line in logo:
+        for line in self.startup_logo():
             for char in line:
                 print(f"{Fore.CYAN}{char}{Style.RESET_ALL}", end='', flush=True)
                 time.sleep(0.001)
@@ -143,164 +1837,447 @@ class HorizonAI:
 
         print(f"\n{Fore.CYAN}HorizonAI v{self.version} is now online and ready to assist you.{Style.RESET_ALL}\n")
 
-    def animated_text(self, text, color=Fore.CYAN):
+    def status(self, message, color=None):
+        """Print a status line unless running headless or in a quiet background task"""
+        if self.verbose and not getattr(self._thread_state, "quiet", False):
+            with self._output_lock:
+                # Clear the spinner's line first, it is redrawn below the status on its next frame
+                clear = "\r" + " " * 20 + "\r" if self.animation_active else ""
+                print(f"{clear}{Fore.CYAN if color is None else color}{message}{Style.RESET_ALL}")
+
+    def stage(self, name):
+        """Time a block as a stage of the traced response, or do nothing when tracing is off"""
+        trace = self.trace
+        if trace is None or getattr(self._thread_state, "quiet", False):
+            return NULL_STAGE
+        return trace.stage(name)
+
+    def record_event(self, name, amount=1):
+        """Count an event such as a cache hit against the traced response"""
+        trace = self.trace
+        if trace is not None and not getattr(self._thread_state, "quiet", False):
+            trace.count(name, amount)
+
+    def prefetch_page(self, subject):
+        """Warm the knowledge base and cache for a subject without printing anything"""
+        self._thread_state.quiet = True
+        self.get_wikipedia_info(subject)
+
+    def animated_text(self, text, color=None):
         """Display text with typing animation"""
+        color = Fore.CYAN if color is None else color
+        if self.mode != "animated":
+            # Flush the whole text in a single write instead of per character
+            sys.stdout.write(f"{color}{text}{Style.RESET_ALL}\n")
+            sys.stdout.flush()
+            return
+
         for char in text:
             print(f"{color}{char}{Style.RESET_ALL}", end='', flush=True)
             time.sleep(self.animation_speed)
         print()
 
-    def thinking_animation(self, duration=2):
-        """Display a 'thinking' animation for the specified duration"""
+    def start_thinking(self, duration=None):
+        """Start the 'thinking' spinner, optionally stopping after duration seconds"""
         self.animation_active = True
+        self._animation_stop.clear()
 
         def animate():
             animations = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
             i = 0
             start_time = time.time()
 
-            while self.animation_active and (time.time() - start_time) < duration:
-                sys.stdout.write(f"\r{Fore.CYAN}Thinking {animations[i % len(animations)]}{Style.RESET_ALL}")
-                sys.stdout.flush()
-                time.sleep(0.1)
+            while self.animation_active and (duration is None or (time.time() - start_time) < duration):
+                with self._output_lock:
+                    sys.stdout.write(f"\r{Fore.CYAN}Thinking {animations[i % len(animations)]}{Style.RESET_ALL}")
+                    sys.stdout.flush()
+                # Wake up immediately when stop_thinking() is called
+                self._animation_stop.wait(0.1)
                 i += 1
 
-            sys.stdout.write("\r" + " " * 20 + "\r")
-            sys.stdout.flush()
+            with self._output_lock:
+                sys.stdout.write("\r" + " " * 20 + "\r")
+                sys.stdout.flush()
 
         # Run animation in a separate thread
-        animation_thread = threading.Thread(target=animate)
-        animation_thread.start()
+        self._animation_thread = threading.Thread(target=animate, daemon=True)
+        self._animation_thread.start()
+
+    def stop_thinking(self):
+        """Stop the 'thinking' spinner and clear its line"""
+        self.animation_active = False
+        self._animation_stop.set()
+        if self._animation_thread is not None:
+            self._animation_thread.join()
+            self._animation_thread = None
+
+    def thinking_animation(self, duration=2):
+        """Display a 'thinking' animation for the specified duration"""
+        self.start_thinking(duration)
 
         # Simulate processing time
         time.sleep(duration)
-        self.animation_active = False
-        animation_thread.join()
+        self.stop_thinking()
+
+    @contextmanager
+    def thinking(self):
+        """Show the spinner in fast mode only while the wrapped work is in flight"""
+        if self.mode != "fast":
+            yield
+            return
+
+        self.start_thinking()
+        try:
+            yield
+        finally:
+            self.stop_thinking()
+
+    def lookup_knowledge(self, subject):
+        """Return the knowledge base page entry for a subject or one of its aliases, or None"""
+        key = self.knowledge_base.get("alias:" + normalize_subject(subject))
+        if key is None:
+            return None
+        return self.knowledge_base.get(key)
+
+    def is_fresh(self, entry):
+        """Whether a knowledge base entry is recent enough to answer without fetching"""
+        return time.time() - entry.get("retrieved_at", 0) < self.knowledge_max_age
+
+    def remember_page(self, info, aliases=()):
+        """Store a retrieved page in the knowledge base under its title and aliases"""
+        key = "wiki:" + normalize_subject(info["title"])
+        previous = self.knowledge_base.get(key) or {}
+        names = set(previous.get("aliases", ())) | {normalize_subject(info["title"])}
+        names.update(normalize_subject(alias) for alias in aliases if alias.strip())
+
+        entry = dict(info, retrieved_at=time.time(), aliases=sorted(names))
+        self.knowledge_base[key] = entry
+        for name in names:
+            self.knowledge_base["alias:" + name] = key
+        self.suggestions.add(info["title"])
+        return entry
+
+    def page_info(self, title, summary, url):
+        """Build the info dict for an existing page"""
+        # Get a summary (first few sentences)
+        summary = summary[0:600] + "..." if len(summary) > 600 else summary
+        return {
+            "title": title,
+            "summary": summary,
+            "url": url,
+            "retrieved": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "exists": True
+        }
+
+    def missing_page_info(self, clean_query, search_results):
+        """Build the info dict for a subject without an exact page"""
+        if search_results:
+            return {
+                "error": f"No exact match for '{clean_query}'",
+                "suggestions": search_results[:5],
+                "retrieved": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "exists": False
+            }
+        return {
+            "error": f"No information found for '{clean_query}'",
+            "exists": False
+        }
 
     def get_wikipedia_info(self, query):
         """Retrieve information from Wikipedia with enhanced handling"""
+        known = None
         try:
-            # Clean and prepare the query
-            clean_query = query.strip().title()  # Capitalize first letters for better search results
-
-            # Log the query attempt
-            print(f"{Fore.BLUE}Searching Wikipedia for: {clean_query}{Style.RESET_ALL}")
-
-            # Search for the page
-            page = self.wiki.page(clean_query)
-
-            if page.exists():
-                # Get a summary (first few sentences)
-                summary = page.summary[0:600] + "..." if len(page.summary) > 600 else page.summary
-                return {
-                    "title": page.title,
-                    "summary": summary,
-                    "url": page.fullurl,
-                    "retrieved": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "exists": True
-                }
-            else:
-                # Try to search for related terms
-                search_results = self.search_wikipedia(clean_query)
-                if search_results:
-                    return {
-                        "error": f"No exact match for '{clean_query}'",
-                        "suggestions": search_results[:5],
-                        "retrieved": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "exists": False
-                    }
-                else:
-                    return {
-                        "error": f"No information found for '{clean_query}'",
-                        "exists": False
-                    }
+            # Clean and prepare the query: title case, but keep small words and existing casing
+            clean_query = (title_candidates(query) or [""])[0]
+
+            # Answer from the local knowledge base first
+            known = self.lookup_knowledge(query)
+            if known is not None and self.is_fresh(known):
+                self.record_event("knowledge_hit")
+                return known
+
+            # Serve repeated subjects from the result cache
+            cache_key = "page:" + normalize_subject(query)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.record_event("cache_hit")
+                return cached
+            self.record_event("cache_miss")
+
+            # Then from the offline dump index, if one is loaded
+            if self.offline_index is not None:
+                offline = self.offline_index.get(query)
+                if offline is not None:
+                    self.record_event("offline_hit")
+                    return self.page_info(offline["title"], offline["summary"], offline["url"])
+                if not self.live_lookups:
+                    info = self.missing_page_info(clean_query,
+                                                  self.local_suggestions(query) or self.search_wikipedia(query))
+                    self.cache.set(cache_key, info, ttl=self.negative_cache_ttl)
+                    return info
+
+            # Callers asking for the same subject at the same time share one fetch
+            if self.inflight.pending(cache_key) is not None:
+                self.record_event("coalesced")
+            return self.inflight.do(cache_key, self.fetch_page, query, clean_query, cache_key,
+                                    timeout=self.coalesce_timeout)
         except Exception as e:
-            print(f"{Fore.RED}Wikipedia retrieval error: {str(e)}{Style.RESET_ALL}")
+            self.status(f"Wikipedia retrieval error: {str(e)}", Fore.RED)
+            if known is not None:
+                # A stale answer beats no answer when Wikipedia is unreachable
+                return known
             return {
                 "error": f"Error retrieving information: {str(e)}",
                 "exists": False
             }
 
+    def fetch_page(self, query, clean_query, cache_key):
+        """Fetch a page from Wikipedia and store the result in the knowledge base and cache"""
+        if self.hedged_lookups is not None:
+            return self.fetch_page_hedged(query, clean_query, cache_key)
+
+        # A title we have seen before is the most likely page name, then the casings of the subject
+        titles = list(dict.fromkeys(filter(None, [self.suggestions.exact(query)] + title_candidates(query))))
+        clean_query = titles[0] if titles else clean_query
+
+        # Log the query attempt
+        self.status(f"Searching Wikipedia for: {clean_query}", Fore.BLUE)
+
+        # Resolve every candidate title in one request, then fetch the extract of the first that exists
+        self.record_event("network_call")
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        with self.stage("wiki_page"):
+            resolved = self.resolve_titles(titles)
+            if resolved is not None:
+                candidate, title, url = resolved
+                self.record_event("network_call")
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire()
+                with self.http.slots:
+                    full_summary = self.wiki.page(title).summary
+
+        if resolved is not None:
+            info = self.remember_page(self.page_info(title, full_summary, url),
+                                      aliases=(query, clean_query, candidate))
+            self.cache.set(cache_key, info)
+            return info
+        else:
+            # Suggest close known titles locally before paying for a network search
+            info = self.missing_page_info(clean_query,
+                                          self.local_suggestions(query) or self.search_wikipedia(clean_query))
+            self.cache.set(cache_key, info, ttl=self.negative_cache_ttl)
+            return info
+
+    def resolve_titles(self, titles):
+        """
+        Look up several candidate titles in a single MediaWiki query and
+        return (candidate, title, url) for the first one that exists, after
+        following normalization and redirects, or None
+        """
+        params = {
+            "action": "query",
+            "titles": "|".join(titles),
+            "prop": "info",
+            "inprop": "url",
+            "redirects": 1,
+            "format": "json"
+        }
+        response = self.http.get(self.api_url, params=params)
+        response.raise_for_status()
+        query = response.json().get("query", {})
+
+        # Map each requested title to the page it ends up on
+        renamed = {}
+        for step in query.get("normalized", []) + query.get("redirects", []):
+            renamed[step["from"]] = step["to"]
+        pages = {page["title"]: page for page in query.get("pages", {}).values()
+                 if "missing" not in page and "invalid" not in page}
+
+        for candidate in titles:
+            title = candidate
+            for _ in range(3):
+                if title not in renamed:
+                    break
+                title = renamed[title]
+            if title in pages:
+                page = pages[title]
+                return candidate, page["title"], page.get("fullurl", "")
+        return None
+
+    def title_variants(self, query, clean_query):
+        """
+        (variant, title) pairs to try for a subject: original casing, the
+        title_candidates casings and the best suggestion
+        """
+        suggestion = self.suggestions.exact(query) or next(iter(self.local_suggestions(query)), None)
+        variants = [("original", query.strip()), ("title", clean_query)]
+        variants.extend(("casing", title) for title in title_candidates(query)[1:])
+        variants.append(("suggestion", suggestion))
+        return [(variant, title) for variant, title in variants if title]
+
+    def fetch_page_hedged(self, query, clean_query, cache_key):
+        """
+        Race every title variant across the configured language editions and
+        keep the first page found; the remaining candidates are cancelled.
+        """
+        self.status(f"Searching Wikipedia for: {clean_query} ({', '.join(self.languages)})", Fore.BLUE)
+
+        # Candidates count each request under a lock and only while the race is undecided, so the
+        # count is final as soon as the race returns
+        calls = []
+        calls_lock = threading.Lock()
+
+        def start_call(cancelled):
+            with calls_lock:
+                if cancelled.is_set():
+                    return False
+                calls.append(None)
+                return True
+
+        # Each distinct title is tried once per edition, default edition and likeliest variants first
+        candidates = []
+        seen = set()
+        for language in self.languages:
+            for variant, title in self.title_variants(query, clean_query):
+                if (language, title) not in seen:
+                    seen.add((language, title))
+                    candidates.append((f"{language}:{variant}", self.fetch_candidate, (start_call, language, title)))
+
+        with self.stage("wiki_page"):
+            label, info = self.hedged_lookups.race(candidates, accept=lambda result: result is not None)
+        with calls_lock:
+            self.record_event("network_call", len(calls))
+        if label is not None:
+            self.record_event("hedge_win:" + label)
+
+        if info is not None:
+            info = self.remember_page(info, aliases=(query, clean_query))
+            self.cache.set(cache_key, info)
+            return info
+        info = self.missing_page_info(clean_query,
+                                      self.local_suggestions(query) or self.search_wikipedia(clean_query))
+        self.cache.set(cache_key, info, ttl=self.negative_cache_ttl)
+        return info
+
+    def fetch_candidate(self, cancelled, start_call, language, title):
+        """
+        Fetch one title from one language edition for a hedged lookup. Each of
+        the two requests (page info, then the extract) is only made while the
+        race is undecided.
+        """
+        if cancelled.is_set():
+            return None
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        with self.http.slots:
+            if not start_call(cancelled):
+                return None
+            page = self.wiki_client(language).page(title)
+            if not page.exists():
+                return None
+
+        # The extract is a second request, so it waits for its own turn with the rate limiter
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        with self.http.slots:
+            if not start_call(cancelled):
+                return None
+            return dict(self.page_info(page.title, page.summary, page.fullurl), language=language)
+
     def search_wikipedia(self, query):
         """Search Wikipedia for related terms when exact match is not found"""
         try:
-            # Make a request to Wikipedia's API
-            url = f"https://en.wikipedia.org/w/api.php"
-            params = {
-                "action": "opensearch",
-                "search": query,
-                "limit": 10,
-                "namespace": 0,
-                "format": "json"
-            }
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                data = response.json()
-                return data[1]  # Return the list of search results
-            return []
+            cache_key = "search:" + normalize_subject(query)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.record_event("search_cache_hit")
+                return cached
+
+            # Prefer title suggestions from the offline index over a network round trip
+            if self.offline_index is not None:
+                suggestions = self.offline_index.prefix_search(query)
+                if suggestions or not self.live_lookups:
+                    return suggestions
+
+            # Identical searches in flight share one request
+            if self.inflight.pending(cache_key) is not None:
+                self.record_event("coalesced")
+            return self.inflight.do(cache_key, self.fetch_search, query, cache_key, timeout=self.coalesce_timeout)
         except Exception as e:
-            print(f"{Fore.RED}Wikipedia search error: {str(e)}{Style.RESET_ALL}")
+            self.status(f"Wikipedia search error: {str(e)}", Fore.RED)
             return []
 
+    def fetch_search(self, query, cache_key):
+        """Run an opensearch request against Wikipedia's API and cache the titles it returns"""
+        # Make a request to Wikipedia's API
+        params = {
+            "action": "opensearch",
+            "search": query,
+            "limit": 10,
+            "namespace": 0,
+            "format": "json"
+        }
+        self.record_event("network_call")
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        with self.stage("search"):
+            response = self.http.get(self.api_url, params=params)
+        if response.status_code == 200:
+            data = response.json()
+            # Only successful responses are cached, errors are retried next time
+            self.cache.set(cache_key, data[1])
+            self.suggestions.add_many(data[1])
+            return data[1]  # Return the list of search results
+        return []
+
     def extract_entities(self, text):
         """Extract key entities from the input text with enhanced detection"""
         # Simple entity extraction - in production would use NER
         entities = []
 
-        # Find capitalized words as potential entities
-        caps_pattern = r'\b[A-Z][a-z]+\b'
-        capitalized_words = re.findall(caps_pattern, text)
-
-        # Common words to exclude
-        common_words = ["I", "You", "He", "She", "They", "We", "It", "What", "Who", "How",
-                        "Why", "When", "Where", "Is", "Are", "The", "A", "An", "This", "That"]
-
-        # Filter out common words
-        filtered_words = [word for word in capitalized_words if word not in common_words]
-        entities.extend(filtered_words)
+        # Find capitalized words as potential entities, filtering out common words
+        entities.extend(word for word in CAPITALIZED_WORD_RE.findall(text) if word not in ENTITY_STOP_WORDS)
 
         # Find multi-word entities (like "New York" or "George Washington")
-        phrase_pattern = r'\b[A-Z][a-z]+ [A-Z][a-z]+\b'
-        phrases = re.findall(phrase_pattern, text)
-        entities.extend(phrases)
+        entities.extend(CAPITALIZED_PHRASE_RE.findall(text))
 
         # Look for quoted terms that might be entities
-        quotes_pattern = r'"([^"]*)"'
-        quoted_terms = re.findall(quotes_pattern, text)
-        entities.extend(quoted_terms)
+        entities.extend(QUOTED_TERM_RE.findall(text))
 
         # Return unique entities
         return list(set(entities))
 
+    def prefetch_subjects(self, text, entities):
+        """
+        The entities of a turn worth fetching ahead, in order of mention: words
+        that are only capitalized because they start a sentence and words that
+        are part of a longer entity ("York" in "New York") are left out
+        """
+        quoted = set(QUOTED_TERM_RE.findall(text))
+        sentence_starts = {match.end() for match in SENTENCE_START_RE.finditer(text)}
+        mid_sentence = {match.group() for match in CAPITALIZED_WORD_RE.finditer(text)
+                        if match.start() not in sentence_starts}
+
+        subjects = []
+        for entity in entities:
+            if entity not in quoted:
+                if " " not in entity and entity not in mid_sentence:
+                    continue
+                if any(other != entity and f" {entity} " in f" {other} " for other in entities):
+                    continue
+            subjects.append(entity)
+        subjects.sort(key=lambda entity: text.find(entity))
+        return subjects
+
     def extract_question_subject(self, question):
         """Extract the main subject of a question for Wikipedia lookup"""
         question = question.strip().lower()
 
-        # Define question patterns to match
-        question_patterns = {
-            "who is": r"who is (.*?)(?:\?|$)",
-            "who are": r"who are (.*?)(?:\?|$)",
-            "who was": r"who was (.*?)(?:\?|$)",
-            "who were": r"who were (.*?)(?:\?|$)",
-            "what is": r"what is (.*?)(?:\?|$)",
-            "what are": r"what are (.*?)(?:\?|$)",
-            "what was": r"what was (.*?)(?:\?|$)",
-            "what were": r"what were (.*?)(?:\?|$)",
-            "where is": r"where is (.*?)(?:\?|$)",
-            "where are": r"where are (.*?)(?:\?|$)",
-            "when did": r"when did (.*?)(?:\?|$)",
-            "when was": r"when was (.*?)(?:\?|$)",
-            "tell me about": r"tell me about (.*?)(?:\.|$)",
-            "information on": r"information on (.*?)(?:\.|$)",
-            "explain": r"explain (.*?)(?:\.|$)"
-        }
-
-        # Check each pattern
-        for pattern_name, pattern in question_patterns.items():
-            match = re.search(pattern, question)
-            if match:
-                subject = match.group(1).strip()
-                return subject
+        # Match the known question phrases in a single pass
+        subject = self.subject_extractor.extract(question)
+        if subject is not None:
+            return subject
 
         # If no pattern matched but there are entities, use the first entity
         entities = self.extract_entities(question)
@@ -308,16 +2285,14 @@ class HorizonAI:
             return entities[0]
 
         # Last resort: remove question words and common words
-        question_words = ["who", "what", "where", "when", "why", "how"]
-        common_words = ["is", "are", "was", "were", "the", "a", "an", "in", "on", "at"]
         words = question.split()
 
-        if words and words[0] in question_words:
+        if words and words[0] in QUESTION_WORDS:
             # Remove the question word
             words = words[1:]
 
             # Remove common words at the beginning
-            while words and words[0] in common_words:
+            while words and words[0] in SUBJECT_STOP_WORDS:
                 words = words[1:]
 
             # Join the remaining words as the subject
@@ -329,97 +2304,52 @@ class HorizonAI:
 
     def analyze_sentiment(self, text):
         """Analyze the sentiment of the input text with improved detection"""
-        text_lower = text.lower()
-        sentiment_scores = {
-            "positive": 0,
-            "negative": 0,
-            "neutral": 0
-        }
-
-        # Expanded sentiment analysis patterns
-        expanded_sentiment_patterns = {
-            "positive": [
-                "happy", "good", "great", "excellent", "wonderful", "amazing", "love", "enjoy", "appreciate",
-                "fantastic", "terrific", "awesome", "superb", "delighted", "pleased", "thrilled", "excited",
-                "impressed", "thankful", "grateful", "satisfied", "perfect", "best", "better", "brilliant"
-            ],
-            "negative": [
-                "sad", "bad", "terrible", "awful", "horrible", "hate", "dislike", "disappointed", "upset",
-                "angry", "annoyed", "frustrated", "irritated", "unhappy", "depressed", "worried", "concerned",
-                "worst", "worse", "poor", "unfortunate", "disappointing", "disastrous", "terrible", "miserable"
-            ],
-            "neutral": [
-                "okay", "fine", "alright", "so-so", "average", "moderate", "adequate", "acceptable",
-                "fair", "reasonable", "standard", "ordinary", "common", "regular", "normal", "typical"
-            ]
-        }
-
-        # Update the sentiment patterns with expanded lists
-        self.sentiment_patterns = expanded_sentiment_patterns
-
-        # Check for sentiment words
-        for sentiment, words in self.sentiment_patterns.items():
-            for word in words:
-                if word in text_lower:
-                    sentiment_scores[sentiment] += 1
-
-        # Check for negations that could flip sentiment
-        negations = ["not", "n't", "no", "never", "neither", "nor", "hardly", "barely"]
-        has_negation = any(neg in text_lower for neg in negations)
-
-        if has_negation:
-            # Simple negation handling - swap positive and negative scores
-            sentiment_scores["positive"], sentiment_scores["negative"] = sentiment_scores["negative"], sentiment_scores[
-                "positive"]
+        sentiment_scores = self.sentiment_lexicon.score(text)
 
         # Determine the dominant sentiment
-        if max(sentiment_scores.values()) == 0:
+        if max(sentiment_scores.values(), default=0) == 0:
             return "neutral"
         return max(sentiment_scores, key=sentiment_scores.get)
 
     def detect_patterns(self, text):
         """Detect patterns in user input and update pattern database"""
         # Update frequency of words and phrases
-        words = text.lower().split()
+        words = [sys.intern(word) for word in text.lower().split()]
         for word in words:
-            if word not in self.pattern_database:
-                self.pattern_database[word] = 1
-            else:
-                self.pattern_database[word] += 1
+            self.pattern_database.add((word,))
 
         # Detect common phrases (n-grams)
         for i in range(len(words) - 1):
-            bigram = f"{words[i]} {words[i + 1]}"
-            if bigram not in self.pattern_database:
-                self.pattern_database[bigram] = 1
-            else:
-                self.pattern_database[bigram] += 1
+            self.pattern_database.add((words[i], words[i + 1]))
 
         # Detect longer phrases (trigrams)
         for i in range(len(words) - 2):
-            trigram = f"{words[i]} {words[i + 1]} {words[i + 2]}"
-            if trigram not in self.pattern_database:
-                self.pattern_database[trigram] = 1
-            else:
-                self.pattern_database[trigram] += 1
+            self.pattern_database.add((words[i], words[i + 1], words[i + 2]))
 
         # Return the most common patterns for this conversation
-        common_patterns = sorted(self.pattern_database.items(), key=lambda x: x[1], reverse=True)[:5]
-        return common_patterns
+        return self.pattern_database.most_common(5)
 
     def update_conversation_context(self, user_input):
         """Update the conversation context based on user input"""
         # Extract entities
         entities = self.extract_entities(user_input)
         if entities:
+            # The bounded deque keeps only the 10 most recent entities
             self.conversation_context["entities"].extend(entities)
-            # Keep only the 10 most recent entities
-            self.conversation_context["entities"] = self.conversation_context["entities"][-10:]
 
         # Determine topic if not set
         if not self.conversation_context["topic"] and entities:
             self.conversation_context["topic"] = entities[0]
 
+        # Fetch what this turn mentions while the user is still reading, except the subject
+        # this turn looks up itself
+        if self.prefetcher is not None and entities:
+            self.prefetcher.retarget(entities)
+            subject = self.extract_question_subject(user_input) if self.is_question(user_input) else None
+            subject = normalize_subject(subject) if subject else None
+            self.prefetcher.submit([entity for entity in self.prefetch_subjects(user_input, entities)
+                                    if normalize_subject(entity) != subject], limit=PREFETCH_PER_TURN)
+
         # Update sentiment
         self.conversation_context["sentiment"] = self.analyze_sentiment(user_input)
 
@@ -429,25 +2359,20 @@ class HorizonAI:
             # Extract the subject
             subject = self.extract_question_subject(user_input)
             if subject:
-                # Add to recent queries list
+                # Add to recent queries list, the deque keeps it to a reasonable size
                 self.conversation_context["recent_queries"].append(subject)
-                # Keep the list to a reasonable size
-                self.conversation_context["recent_queries"] = self.conversation_context["recent_queries"][-5:]
 
     def find_relevant_response(self, user_input):
         """Find the most relevant response based on pattern matching"""
-        # Look for direct matches in conversation history
+        # Look for a close match among previous inputs that already have a response
         best_match = None
-        best_match_ratio = 0
-
-        # Check for similarity with previous conversation
-        for entry in self.conversation_history:
-            if "user_input" in entry:
-                similarity = SequenceMatcher(None, user_input.lower(), entry["user_input"].lower()).ratio()
-                if similarity > best_match_ratio and similarity > 0.7:  # Threshold for considering it a match
-                    best_match_ratio = similarity
-                    if "ai_response" in entry:
-                        best_match = entry["ai_response"]
+        with self.stage("find_relevant_response"):
+            match = self.similarity_index.best_match(user_input, threshold=0.7)
+            if match:
+                # Archived turns are paged back in from disk only when they win
+                turn = self.conversation_history.get(match[0])
+                if turn is not None:
+                    best_match = turn.ai_response
 
         # If we found a very similar previous interaction, use it as a base for response
         if best_match:
@@ -512,86 +2437,227 @@ class HorizonAI:
 
     def generate_response(self, user_input):
         """Generate a response based on user input with enhanced understanding"""
+        parts = []
+        for kind, text in self.stream_response(user_input):
+            if kind == "ack":
+                self.status(text, Fore.YELLOW)
+            else:
+                parts.append(text)
+
+        # Return the generated response
+        return "".join(parts)
+
+    def stream_response(self, user_input):
+        """
+        Generate a response incrementally, yielding (kind, text) events: an
+        "ack" naming the identified subject before any lookup starts, then
+        "text" chunks whose concatenation is the full response.
+        """
+        if not self.tracing:
+            yield from self._stream_response(user_input)
+            return
+
+        # Trace this response; it is kept as last_trace and fed to the histograms
+        trace = self.trace = Trace()
+        try:
+            for event in self._stream_response(user_input):
+                if "first_chunk" not in trace.stages:
+                    trace.mark("first_chunk")
+                yield event
+        finally:
+            self.trace = None
+            trace.mark("total")
+            self.last_trace = trace
+            self.latency.record(trace)
+
+    def _stream_response(self, user_input):
+        """Produce the events for stream_response"""
         # Update conversation context
-        self.update_conversation_context(user_input)
+        with self.stage("context"):
+            self.update_conversation_context(user_input)
 
         # Add user input to conversation history
-        self.conversation_history.append(
-            {"user_input": user_input, "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
-
-        # Display thinking animation - variable duration for more natural feel
-        self.thinking_animation(random.uniform(1.0, 2.5))
-
-        # Check if it's a question about the AI itself
-        if "your name" in user_input.lower():
-            response = f"I am {self.name}, version {self.version}, an advanced AI assistant with enhanced conversational capabilities and knowledge integration."
-
-        elif any(phrase in user_input.lower() for phrase in
-                 ["how do you work", "how do you function", "how were you made"]):
-            response = "I function through advanced pattern recognition and contextual understanding. Unlike systems based solely on predefined prompts, I analyze conversation dynamics, maintain contextual memory, and integrate real-time information from sources like Wikipedia. My neural processing allows me to understand complex questions and provide comprehensive responses."
-
-        # Check if it's a question that should trigger Wikipedia lookup
-        elif self.is_question(user_input):
-            # Extract the subject of the question
-            query_subject = self.extract_question_subject(user_input)
-
-            if query_subject:
-                # Attempt Wikipedia lookup
-                print(f"{Fore.YELLOW}Identified question about: {query_subject}{Style.RESET_ALL}")
-                info = self.get_wikipedia_info(query_subject)
-
-                if info.get("exists", False):
-                    # Format Wikipedia information into a response
-                    response = f"According to Wikipedia, {info['summary']}\n\nSource: {info['url']}"
-                elif "suggestions" in info:
-                    response = f"I couldn't find exact information on '{query_subject}'. Did you mean: {', '.join(info['suggestions'])}?"
+        turn = self.conversation_history.append(user_input)
+        parts = []
+
+        try:
+            # Display thinking animation - variable duration for more natural feel
+            if self.mode == "animated":
+                with self.stage("animation"):
+                    self.thinking_animation(random.uniform(1.0, 2.5))
+
+            # Check if it's a question about the AI itself
+            if "your name" in user_input.lower():
+                parts.append(f"I am {self.name}, version {self.version}, an advanced AI assistant with enhanced conversational capabilities and knowledge integration.")
+                yield "text", parts[-1]
+
+            elif any(phrase in user_input.lower() for phrase in
+                     ["how do you work", "how do you function", "how were you made"]):
+                parts.append("I function through advanced pattern recognition and contextual understanding. Unlike systems based solely on predefined prompts, I analyze conversation dynamics, maintain contextual memory, and integrate real-time information from sources like Wikipedia. My neural processing allows me to understand complex questions and provide comprehensive responses.")
+                yield "text", parts[-1]
+
+            # Check if it's a question that should trigger Wikipedia lookup
+            elif self.is_question(user_input):
+                # Extract the subject of the question
+                with self.stage("extract_subject"):
+                    query_subject = self.extract_question_subject(user_input)
+
+                if query_subject:
+                    # Acknowledge the subject before waiting on the lookup
+                    yield "ack", f"Identified question about: {query_subject}"
+                    lookup_start = time.perf_counter()
+                    with self.thinking(), self.stage("lookup"):
+                        info = self.get_wikipedia_info(query_subject)
+                    self.last_lookup_time = time.perf_counter() - lookup_start
+                    if self.prefetcher is not None:
+                        self.prefetcher.claim(query_subject)
+                    if self.mode == "fast":
+                        self.status(f"Lookup completed in {self.last_lookup_time * 1000:.0f} ms", Fore.BLUE)
+
+                    if info.get("exists", False):
+                        # Format Wikipedia information into a response, one sentence at a time
+                        parts.append("According to Wikipedia, ")
+                        yield "text", parts[-1]
+                        for sentence in SENTENCE_RE.findall(info["summary"]):
+                            parts.append(sentence)
+                            yield "text", sentence
+                        parts.append(f"\n\nSource: {info['url']}")
+                        yield "text", parts[-1]
+                    elif "suggestions" in info:
+                        parts.append(f"I couldn't find exact information on '{query_subject}'. Did you mean: {', '.join(info['suggestions'])}?")
+                        yield "text", parts[-1]
+                        if self.prefetcher is not None:
+                            self.prefetcher.submit(info["suggestions"][:3])
+                    else:
+                        # No Wikipedia info but still try to give a thoughtful response
+                        parts.append(f"I don't have specific Wikipedia information about '{query_subject}'. Would you like to know something else about this topic, or shall we explore a different subject?")
+                        yield "text", parts[-1]
                 else:
-                    # No Wikipedia info but still try to give a thoughtful response
-                    response = f"I don't have specific Wikipedia information about '{query_subject}'. Would you like to know something else about this topic, or shall we explore a different subject?"
-            else:
-                # If we couldn't extract a subject, respond conversationally
+                    # If we couldn't extract a subject, respond conversationally
+                    pattern_response = self.find_relevant_response(user_input)
+                    if pattern_response:
+                        parts.append(pattern_response)
+                    else:
+                        parts.append("That's an interesting question. Could you provide more details about what you're trying to learn?")
+                    yield "text", parts[-1]
+
+            # Use pattern-based response if available for non-questions
+            elif not self.is_question(user_input):
                 pattern_response = self.find_relevant_response(user_input)
                 if pattern_response:
                     response = pattern_response
                 else:
-                    response = "That's an interesting question. Could you provide more details about what you're trying to learn?"
-
-        # Use pattern-based response if available for non-questions
-        elif not self.is_question(user_input):
-            pattern_response = self.find_relevant_response(user_input)
-            if pattern_response:
-                response = pattern_response
+                    # Generate a contextual response
+                    if self.conversation_context["sentiment"] == "positive":
+                        response = f"I'm glad to hear that! "
+                    elif self.conversation_context["sentiment"] == "negative":
+                        response = f"I understand your concern. "
+                    else:
+                        response = ""
+
+                    # Add topic-related content
+                    if self.conversation_context["topic"]:
+                        response += f"Regarding {self.conversation_context['topic']}, "
+
+                    # Add a genuinely thoughtful response
+                    thoughtful_responses = [
+                        "I find that topic quite interesting. What aspects would you like to explore further?",
+                        "That's a fascinating perspective. Have you considered how this connects to broader themes?",
+                        "I appreciate you sharing that. Would you like to discuss the implications in more detail?",
+                        "That's a meaningful point. How does this relate to your personal experience?",
+                        "Interesting thoughts. I'm curious about what led you to this particular viewpoint."
+                    ]
+                    response += random.choice(thoughtful_responses)
+                parts.append(response)
+                yield "text", response
             else:
-                # Generate a contextual response
-                if self.conversation_context["sentiment"] == "positive":
-                    response = f"I'm glad to hear that! "
-                elif self.conversation_context["sentiment"] == "negative":
-                    response = f"I understand your concern. "
-                else:
-                    response = ""
-
-                # Add topic-related content
-                if self.conversation_context["topic"]:
-                    response += f"Regarding {self.conversation_context['topic']}, "
-
-                # Add a genuinely thoughtful response
-                thoughtful_responses = [
-                    "I find that topic quite interesting. What aspects would you like to explore further?",
-                    "That's a fascinating perspective. Have you considered how this connects to broader themes?",
-                    "I appreciate you sharing that. Would you like to discuss the implications in more detail?",
-                    "That's a meaningful point. How does this relate to your personal experience?",
-                    "Interesting thoughts. I'm curious about what led you to this particular viewpoint."
-                ]
-                response += random.choice(thoughtful_responses)
-        else:
-            # Default response for anything else
-            response = "I find your message interesting. Could you tell me more about what you're thinking?"
+                # Default response for anything else
+                parts.append("I find your message interesting. Could you tell me more about what you're thinking?")
+                yield "text", parts[-1]
+        finally:
+            # Store AI response in history and make the exchange searchable, even if the stream was abandoned
+            turn.ai_response = "".join(parts)
+            self.similarity_index.add(turn.turn_id, user_input)
+            if turn.turn_id >= self.similarity_window:
+                self.similarity_index.remove(turn.turn_id - self.similarity_window)
+
+    def resolve_subject(self, item, extract_subject=True):
+        """Look up a single question or subject, returning the subject and its info"""
+        subject = item.strip()
+        if extract_subject and self.is_question(subject):
+            subject = self.extract_question_subject(subject)
+        if not subject:
+            raise ValueError("Empty subject")
+        return subject, self.get_wikipedia_info(subject)
+
+    def batch_query(self, items, concurrency=8, extract_subject=True):
+        """
+        Resolve an iterable of questions or subjects with bounded concurrency.
+        Results are yielded as they complete, so they may arrive out of order;
+        each carries the item's index. A failing item yields an "error" record
+        instead of aborting the rest of the batch.
+        """
+        def resolve(index, item):
+            try:
+                subject, info = self.resolve_subject(item, extract_subject)
+                return {"index": index, "input": item, "subject": subject, "info": info}
+            except Exception as e:
+                return {"index": index, "input": item, "subject": None, "error": str(e)}
 
-        # Store AI response in history
-        self.conversation_history[-1]["ai_response"] = response
+        items = iter(enumerate(items))
+        pending = set()
 
-        # Return the generated response
-        return response
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Keep a bounded window of work in flight so huge inputs are not queued up front
+            for index, item in items:
+                pending.add(executor.submit(resolve, index, item))
+                if len(pending) >= concurrency * 2:
+                    break
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+                    next_item = next(items, None)
+                    if next_item is not None:
+                        pending.add(executor.submit(resolve, *next_item))
+
+    def render_stream(self, user_input):
+        """Print a streamed response as each chunk arrives"""
+        started = False
+        for kind, text in self.stream_response(user_input):
+            if kind == "ack":
+                self.status(text, Fore.YELLOW)
+                continue
+            if not started:
+                sys.stdout.write(f"\n{Fore.CYAN}{self.name}: ")
+                started = True
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        sys.stdout.write(f"{Style.RESET_ALL}\n")
+        sys.stdout.flush()
+
+    def shutdown(self):
+        """Persist state and release files before exiting"""
+        if self._parent is not None:
+            # Shared resources belong to the instance that created this session
+            self.conversation_history.close()
+            return
+
+        self._suggestions_stop.set()
+        if self._suggestions_thread is not None:
+            self._suggestions_thread.join()
+        self.save_knowledge_base()
+        self.save_cache()
+        self.conversation_history.close()
+        if isinstance(self.knowledge_base, KnowledgeStore):
+            self.knowledge_base.close()
+        if self.offline_index is not None:
+            self.offline_index.close()
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self.hedged_lookups is not None:
+            self.hedged_lookups.close()
 
     def run(self):
         """Main interaction loop for HorizonAI"""
@@ -603,15 +2669,18 @@ class HorizonAI:
 
                 if user_input.lower() in ["exit", "quit", "bye", "goodbye"]:
                     self.animated_text(f"\n{self.name}: Goodbye! It was nice talking with you.", Fore.GREEN)
-                    self.save_knowledge_base()
+                    self.shutdown()
                     break
 
-                response = self.generate_response(user_input)
-                self.animated_text(f"\n{self.name}: {response}", Fore.CYAN)
+                if self.mode == "fast":
+                    self.render_stream(user_input)
+                else:
+                    response = self.generate_response(user_input)
+                    self.animated_text(f"\n{self.name}: {response}", Fore.CYAN)
 
             except KeyboardInterrupt:
                 print(f"\n\n{Fore.RED}Conversation interrupted.{Style.RESET_ALL}")
-                self.save_knowledge_base()
+                self.shutdown()
                 break
             except Exception as e:
                 print(f"\n{Fore.RED}An error occurred: {str(e)}{Style.RESET_ALL}")
@@ -621,5 +2690,29 @@ class HorizonAI:
 
 # Run the AI if this script is executed directly
 if __name__ == "__main__":
-    horizon = HorizonAI()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="HorizonAI interactive assistant")
+    parser.add_argument("--mode", choices=RESPONSE_MODES, default="animated",
+                        help="response style: classic animations, fast (no synthetic delay) or headless")
+    parser.add_argument("--history-archive", metavar="PATH",
+                        help="append turns that leave the in-memory history to this JSONL file")
+    parser.add_argument("--offline-index", metavar="DIR",
+                        help="answer from an offline summary index built with dump_index.py")
+    parser.add_argument("--offline-only", action="store_true",
+                        help="never fall back to live Wikipedia lookups")
+    parser.add_argument("--trace-log", metavar="PATH",
+                        help="trace every response and append per-stage timings to this JSONL file")
+    parser.add_argument("--languages", default="en", metavar="CODES",
+                        help="comma separated Wikipedia editions, default edition first")
+    parser.add_argument("--hedge", action="store_true",
+                        help="race title variants across every edition and keep the first page found")
+    parser.add_argument("--hedge-delay", type=float, default=0.0, metavar="SECONDS",
+                        help="stagger hedged candidates by this many seconds instead of firing all at once")
+    args = parser.parse_args()
+
+    horizon = HorizonAI(mode=args.mode, history_archive=args.history_archive,
+                        offline_index=args.offline_index, live_lookups=not args.offline_only, prefetch=True,
+                        trace_log=args.trace_log, languages=args.languages.split(","), hedge=args.hedge,
+                        hedge_delay=args.hedge_delay)
     horizon.run()
\ No newline at end of file
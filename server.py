@@ -0,0 +1,275 @@
+import json
+import time
+import uuid
+import asyncio
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from main import HorizonAI
+
+
+class Session:
+    """One client conversation hosted by the server"""
+
+    __slots__ = ("session_id", "ai", "lock", "last_used")
+
+    def __init__(self, session_id, ai):
+        self.session_id = session_id
+        self.ai = ai
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+
+class HorizonServer:
+    """
+    Line-protocol server hosting many HorizonAI conversations in one process.
+    Every session keeps its own history and context; the connection pool,
+    caches, knowledge base and lookup indexes belong to one shared instance.
+
+    Each request is a JSON line: {"session": id, "message": text}. Sessions
+    are created on first use; a line without a session id uses one scoped to
+    the connection. With "stream": true the reply arrives as several lines:
+    {"ack"} and {"chunk"} events followed by the final {"response"}.
+    Add "trace": true to include the per-stage trace of the response.
+    {"command": "stats"}, {"command": "metrics"} (Prometheus text) and
+    {"command": "close"} are also accepted. Idle sessions are evicted after idle_timeout seconds, and the
+    least recently used session that is not answering a request is evicted when max_sessions is reached.
+    """
+
+    def __init__(self, ai=None, idle_timeout=900, max_sessions=10000, workers=32,
+                 session_history=50, session_patterns=1000, sweep_interval=30):
+        self.ai = ai or HorizonAI(mode="headless")
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.session_history = session_history
+        self.session_patterns = session_patterns
+        self.sweep_interval = sweep_interval
+
+        # Sessions in least recently used order
+        self.sessions = OrderedDict()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="horizon-session")
+        self.evicted = 0
+        self.requests = 0
+        self._server = None
+        self._sweeper = None
+
+    def session(self, session_id):
+        """Fetch a session by id, creating it and evicting the oldest if needed"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            self.trim(self.max_sessions - 1)
+            ai = self.ai.new_session(history_size=self.session_history, pattern_capacity=self.session_patterns)
+            session = self.sessions[session_id] = Session(session_id, ai)
+        else:
+            self.sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        return session
+
+    def evict(self, session_id):
+        """Drop a session and release its per-session resources"""
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.ai.shutdown()
+            self.evicted += 1
+
+    def trim(self, limit):
+        """
+        Evict the least recently used sessions that are not answering a request
+        until at most limit remain; while every session is busy the cap is
+        exceeded until they finish
+        """
+        while len(self.sessions) > limit:
+            idle = next((session_id for session_id, session in self.sessions.items()
+                         if not session.lock.locked()), None)
+            if idle is None:
+                break
+            self.evict(idle)
+
+    def evict_idle(self):
+        """Evict every session that has been idle longer than idle_timeout"""
+        cutoff = time.monotonic() - self.idle_timeout
+        # Sessions are kept in use order, so the idle ones are at the front
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session.last_used > cutoff or session.lock.locked():
+                break
+            self.evict(session_id)
+        # Sessions kept past max_sessions while they were busy are dropped once they are idle
+        self.trim(self.max_sessions)
+
+    async def sweep(self):
+        """Periodically evict idle sessions"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.evict_idle()
+
+    def stats(self):
+        """Summary of server activity and shared cache usage"""
+        return {
+            "sessions": len(self.sessions),
+            "evicted": self.evicted,
+            "requests": self.requests,
+            "cache": self.ai.cache.stats(),
+            "latency": self.ai.latency.summary(),
+            "coalesced_lookups": self.ai.inflight.followers,
+            "hedged_lookups": self.ai.hedged_lookups.stats() if self.ai.hedged_lookups is not None else None,
+        }
+
+    async def respond(self, session_id, message):
+        """Answer one message in a session without blocking the event loop"""
+        session = self.session(session_id)
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        # Messages in one session are answered in order; sessions run in parallel
+        async with session.lock:
+            response = await loop.run_in_executor(self.executor, session.ai.generate_response, message)
+        session.last_used = time.monotonic()
+        return response
+
+    async def stream(self, session_id, message, send):
+        """Answer one message in a session, passing each event to send as it is produced"""
+        session = self.session(session_id)
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        parts = []
+        async with session.lock:
+            events = session.ai.stream_response(message)
+            try:
+                while True:
+                    # Each step may block on a lookup, so it runs on the worker pool
+                    event = await loop.run_in_executor(self.executor, next, events, None)
+                    if event is None:
+                        break
+                    kind, text = event
+                    if kind == "text":
+                        parts.append(text)
+                        await send({"session": session_id, "chunk": text})
+                    else:
+                        await send({"session": session_id, kind: text})
+            finally:
+                await loop.run_in_executor(self.executor, events.close)
+        session.last_used = time.monotonic()
+        return "".join(parts)
+
+    async def handle_request(self, request, default_session, send):
+        """Turn one decoded request into a reply dictionary"""
+        command = request.get("command")
+        session_id = str(request.get("session") or default_session)
+
+        if command == "stats":
+            return {"stats": self.stats()}
+        if command == "metrics":
+            return {"metrics": self.ai.latency.prometheus()}
+        if command == "close":
+            self.evict(session_id)
+            return {"session": session_id, "closed": True}
+        if command is not None:
+            return {"error": f"Unknown command: {command}"}
+
+        message = request.get("message")
+        if not isinstance(message, str) or not message.strip():
+            return {"session": session_id, "error": "Missing message"}
+
+        start = time.perf_counter()
+        if request.get("stream"):
+            response = await self.stream(session_id, message, send)
+        else:
+            response = await self.respond(session_id, message)
+        reply = {
+            "session": session_id,
+            "response": response,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+        last_trace = self.sessions[session_id].ai.last_trace if session_id in self.sessions else None
+        if request.get("trace") and last_trace is not None:
+            reply["trace"] = last_trace.to_dict()
+        return reply
+
+    async def handle_connection(self, reader, writer):
+        """Serve JSON line requests from one client connection"""
+        default_session = uuid.uuid4().hex
+
+        async def send(reply):
+            writer.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                    reply = await self.handle_request(request, default_session, send)
+                except ValueError as e:
+                    reply = {"error": f"Invalid request: {e}"}
+                except Exception as e:
+                    reply = {"error": f"Request failed: {e}"}
+
+                await send(reply)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # The connection-scoped session cannot be reached again
+            self.evict(default_session)
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """Start listening and return the asyncio server"""
+        self._server = await asyncio.start_server(self.handle_connection, host, port, limit=1 << 20)
+        self._sweeper = asyncio.create_task(self.sweep())
+        return self._server
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """Serve until cancelled"""
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def stop(self):
+        """Stop accepting connections and close every session"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for session_id in list(self.sessions):
+            self.evict(session_id)
+        self.executor.shutdown(wait=True)
+        self.ai.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve many HorizonAI conversations from one process")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--idle-timeout", type=float, default=900, help="seconds before an idle session is evicted")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=32, help="threads answering messages concurrently")
+    parser.add_argument("--offline-index", default=None, help="directory built by dump_index.py")
+    parser.add_argument("--offline-only", action="store_true", help="never query Wikipedia over the network")
+    parser.add_argument("--no-tracing", action="store_true", help="disable per-stage latency tracing")
+    parser.add_argument("--languages", default="en", help="comma separated Wikipedia editions, default first")
+    parser.add_argument("--hedge", action="store_true", help="race title variants across every edition")
+    parser.add_argument("--hedge-delay", type=float, default=0.0, help="seconds between hedged candidates")
+    args = parser.parse_args()
+
+    horizon = HorizonServer(
+        HorizonAI(mode="headless", offline_index=args.offline_index, live_lookups=not args.offline_only,
+                  tracing=not args.no_tracing, languages=args.languages.split(","), hedge=args.hedge,
+                  hedge_delay=args.hedge_delay),
+        idle_timeout=args.idle_timeout, max_sessions=args.max_sessions, workers=args.workers)
+    print(f"HorizonAI server listening on {args.host}:{args.port}")
+    try:
+        asyncio.run(horizon.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        horizon.executor.shutdown(wait=True)
+        horizon.ai.shutdown()
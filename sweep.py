@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from itertools import islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from main import HorizonAI, Fore, Style
+
+# HorizonAI instance of the current worker process, created by init_worker
+_worker = None
+_worker_concurrency = 8
+_worker_extract_subject = True
+
+
+class RateLimiter:
+    """
+    Limit shared by every process of a sweep: at most rate upstream calls per
+    second, spaced evenly. The schedule lives in shared memory, so it must be
+    handed to workers when they start (for example through initargs).
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = multiprocessing.Value("d", 0.0, lock=False)
+        self._lock = multiprocessing.Lock()
+
+    def acquire(self):
+        """Block until the caller may make its next upstream call"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.value)
+            self._next.value = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def init_worker(rate_limiter, concurrency, extract_subject):
+    """Create the headless HorizonAI a worker process uses for all of its shards"""
+    global _worker, _worker_concurrency, _worker_extract_subject
+    # Each worker has its own connection pool and in-memory caches; only the rate limit is shared
+    _worker = HorizonAI(mode="headless", cache_path=None, knowledge_path=None, rate_limiter=rate_limiter)
+    _worker_concurrency = concurrency
+    _worker_extract_subject = extract_subject
+
+
+def resolve_shard(shard):
+    """Resolve a list of (index, item) pairs in a worker, returning records in input order"""
+    indexes = [index for index, _ in shard]
+    records = [None] * len(shard)
+    for record in _worker.batch_query([item for _, item in shard], concurrency=_worker_concurrency,
+                                      extract_subject=_worker_extract_subject):
+        position = record["index"]
+        record["index"] = indexes[position]
+        records[position] = record
+    return records
+
+
+def completed_records(path):
+    """
+    Count the complete records already in an output file. A torn final line
+    left by a killed sweep is truncated away so the file can be appended to.
+    """
+    if not os.path.exists(path):
+        return 0
+
+    count = 0
+    valid_end = 0
+    with open(path, "rb+") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                json.loads(line)
+            except ValueError:
+                break
+            count += 1
+            valid_end += len(line)
+        f.truncate(valid_end)
+    return count
+
+
+def read_subjects(source):
+    """Yield one subject per line from a file, or from stdin when source is "-" """
+    if source == "-":
+        for line in sys.stdin:
+            yield line.rstrip("\n")
+        return
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            yield line.rstrip("\n")
+
+
+def shards(items, size):
+    """Group an iterable into lists of at most size items"""
+    items = iter(items)
+    while True:
+        shard = list(islice(items, size))
+        if not shard:
+            return
+        yield shard
+
+
+def sweep(subjects, output, workers=None, shard_size=64, concurrency=8, rate=None, extract_subject=True,
+          resume=True, progress_every=10):
+    """
+    Resolve every subject across a process pool, appending one JSON record per
+    input line to output in input order. With resume, subjects that already
+    have a record in output are skipped. Returns the number of records written.
+    """
+    workers = workers or os.cpu_count() or 1
+    done = completed_records(output) if resume else 0
+    if done:
+        print(f"{Fore.YELLOW}Resuming after {done} completed subjects{Style.RESET_ALL}", file=sys.stderr)
+
+    rate_limiter = RateLimiter(rate) if rate else None
+    work = shards(islice(enumerate(subjects), done, None), shard_size)
+    written = 0
+    shards_written = 0
+    start = time.perf_counter()
+
+    with open(output, "a" if resume else "w", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                initargs=(rate_limiter, concurrency, extract_subject)) as pool:
+        # Keep a bounded window of shards in flight and write them back in submission order
+        pending = deque()
+        for shard in islice(work, workers * 2):
+            pending.append(pool.submit(resolve_shard, shard))
+
+        while pending:
+            records = pending.popleft().result()
+            out.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+            out.flush()
+            written += len(records)
+            shards_written += 1
+
+            shard = next(work, None)
+            if shard is not None:
+                pending.append(pool.submit(resolve_shard, shard))
+
+            if progress_every and shards_written % progress_every == 0:
+                rate_done = written / (time.perf_counter() - start)
+                print(f"{Fore.CYAN}{done + written} subjects done ({rate_done:.1f}/s){Style.RESET_ALL}",
+                      file=sys.stderr)
+
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resolve a large list of subjects across a pool of HorizonAI workers")
+    parser.add_argument("subjects", help="file with one subject or question per line, or - for stdin")
+    parser.add_argument("output", help="JSONL file to write records to, in input order")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--shard-size", type=int, default=64, help="subjects handed to a worker at a time")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent lookups inside each worker")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="upstream lookups per second across all workers (default: unlimited)")
+    parser.add_argument("--no-extract", action="store_true", help="treat every line as a subject, not a question")
+    parser.add_argument("--restart", action="store_true", help="overwrite the output instead of resuming")
+    args = parser.parse_args()
+
+    try:
+        total = sweep(read_subjects(args.subjects), args.output, workers=args.workers, shard_size=args.shard_size,
+                      concurrency=args.concurrency, rate=args.rate, extract_subject=not args.no_extract,
+                      resume=not args.restart)
+        print(f"{Fore.GREEN}Wrote {total} records to {args.output}{Style.RESET_ALL}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print(f"\n{Fore.RED}Sweep interrupted; run again to resume.{Style.RESET_ALL}", file=sys.stderr)
+        sys.exit(130)
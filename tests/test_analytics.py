@@ -0,0 +1,65 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from analytics import CorpusAnalysis
+from main import HorizonAI
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "analytics_messages.jsonl")
+
+
+def read_messages():
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+MESSAGES = read_messages()
+
+
+@pytest.fixture(scope="module")
+def ai():
+    ai = HorizonAI(mode="headless", cache_path=None, knowledge_path=None)
+    yield ai
+    ai.shutdown()
+
+
+@pytest.fixture(scope="module")
+def analysis():
+    return CorpusAnalysis(MESSAGES)
+
+
+def test_fixture_covers_the_edge_cases():
+    joined = "".join(MESSAGES)
+    for fragment in ("\t", "\n", "’t", "n't", '"', "not ", "New York"):
+        assert fragment in joined
+
+
+def test_sentiment_matches_analyze_sentiment(ai, analysis):
+    assert list(analysis.sentiment()) == [ai.analyze_sentiment(message) for message in MESSAGES]
+
+
+def test_sentiment_scores_match_the_lexicon(ai, analysis):
+    scores = analysis.sentiment_scores()
+    for row, message in zip(scores.tolist(), MESSAGES):
+        expected = ai.sentiment_lexicon.score(message)
+        assert dict(zip(analysis.labels, row)) == expected, message
+
+
+def test_entities_match_extract_entities(ai, analysis):
+    for entities, message in zip(analysis.entities(), MESSAGES):
+        assert entities == set(ai.extract_entities(message)), message
+
+
+def test_pattern_counts_match_detect_patterns():
+    ai = HorizonAI(mode="headless", cache_path=None, knowledge_path=None)
+    try:
+        for message in MESSAGES:
+            ai.detect_patterns(message)
+        expected = {key: ai.pattern_database[key] for key in ai.pattern_database._counts}
+    finally:
+        ai.shutdown()
+    assert len(expected) < ai.pattern_database.capacity
+    assert CorpusAnalysis(MESSAGES).pattern_counts() == expected
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from dump_index import SummaryIndex, build_index
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "edge_cases.jsonl")
+
+
+@pytest.fixture(params=[1, 2, 200000], ids=["one-per-run", "small-runs", "single-run"])
+def index(request, tmp_path):
+    count = build_index(FIXTURE, str(tmp_path), chunk_size=request.param)
+    assert count == 6
+    index = SummaryIndex(str(tmp_path))
+    yield index
+    index.close()
+
+
+def test_titles_with_line_breaks_and_tabs_are_indexed(index):
+    assert index.get("foo bar")["title"] == "Foo\nBar"
+    assert index.get("Tab and Return")["url"] == "https://en.wikipedia.org/wiki/Tab_and_Return"
+    assert "Foo Bar" in list(index.titles())
+
+
+def test_duplicate_articles_keep_the_first(index):
+    assert index.get("paris")["summary"] == "Paris is the capital of France."
+    assert list(index.titles()).count("Paris") == 1
+    assert "paris" not in list(index.titles())
+
+
+def test_prefix_search_returns_each_subject_once(index):
+    assert index.prefix_search("par") == ["Paris", "Parish"]
+
+
+def test_missing_subject(index):
+    assert index.get("London") is None
+    assert index.prefix_search("zzz") == []
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("wikipediaapi")
+
+from benchmark import BenchmarkHorizonAI, StubWikipedia, topic_title
+
+
+def visible_lines(output):
+    """What a terminal shows for each line: the text after its last carriage return"""
+    return [line.split("\r")[-1] for line in output.split("\n")]
+
+
+def test_status_lines_are_not_written_into_the_spinner(tmp_path, capsys):
+    stub = StubWikipedia(topics=5, latency=0.3)
+    ai = BenchmarkHorizonAI(mode="fast", api_url=stub.api_url, cache_path=str(tmp_path / "cache.json"),
+                            knowledge_path=str(tmp_path / "knowledge.db"))
+    try:
+        capsys.readouterr()
+        ai.generate_response(f"What is {topic_title(1)}?")
+        output = capsys.readouterr().out
+    finally:
+        ai.shutdown()
+        stub.close()
+
+    lines = visible_lines(output)
+    assert f"Searching Wikipedia for: {topic_title(1)}" in lines
+    assert not [line for line in lines if "Thinking" in line and "Searching" in line]
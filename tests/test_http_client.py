@@ -0,0 +1,165 @@
+import socket
+import threading
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+import main
+from main import HTTPClient
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers each request with the next (status, headers) of the server's script"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            status, headers = server.script[min(len(server.requests), len(server.script) - 1)]
+            server.requests.append((self.client_address, self.path))
+        body = b'{"ok": true}' if status == 200 else b"{}"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(*script):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+        server.daemon_threads = True
+        server.script = script
+        server.requests = []
+        server.lock = threading.Lock()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}/w/api.php"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the client's backoff delays instead of sleeping, with the full jitter range"""
+    delays = []
+    monkeypatch.setattr(main.time, "sleep", delays.append)
+    monkeypatch.setattr(main.random, "uniform", lambda low, high: high)
+    return delays
+
+
+def test_retries_429_then_503_over_one_connection(serve, sleeps):
+    server, url = serve((429, {"Retry-After": "2"}), (503, {}), (200, {}))
+    client = HTTPClient(max_retries=3, backoff_base=0.5)
+    try:
+        response = client.get(url, params={"action": "query"})
+    finally:
+        client.close()
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    # Retry-After wins for the 429, the 503 gets the second backoff step
+    assert sleeps == [2.0, 1.0]
+    assert len(server.requests) == 3
+    assert len({address for address, _ in server.requests}) == 1
+    assert all(path == "/w/api.php?action=query" for _, path in server.requests)
+
+
+def test_gives_up_after_max_retries(serve, sleeps):
+    server, url = serve((503, {}))
+    client = HTTPClient(max_retries=2, backoff_base=0.5)
+    try:
+        response = client.get(url)
+    finally:
+        client.close()
+
+    assert response.status_code == 503
+    assert len(server.requests) == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_connection_errors_are_raised_after_max_retries(sleeps):
+    # A port that was just free is very likely still closed
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    client = HTTPClient(max_retries=2, backoff_base=0.5, timeout=(0.5, 0.5))
+    try:
+        with pytest.raises(requests.ConnectionError):
+            client.get(f"http://127.0.0.1:{port}/")
+    finally:
+        client.close()
+    assert sleeps == [0.5, 1.0]
+
+
+def test_non_retryable_status_is_returned_at_once(serve, sleeps):
+    server, url = serve((404, {}))
+    client = HTTPClient()
+    try:
+        assert client.get(url).status_code == 404
+    finally:
+        client.close()
+    assert len(server.requests) == 1
+    assert sleeps == []
+
+
+def test_retry_after_http_date():
+    client = HTTPClient(backoff_max=60.0)
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 28.0 <= client.backoff_delay(0, format_datetime(later, usegmt=True)) <= 30.0
+
+
+def test_retry_after_in_the_past_retries_at_once():
+    client = HTTPClient()
+    earlier = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert client.backoff_delay(0, format_datetime(earlier, usegmt=True)) == 0.0
+
+
+def test_retry_after_is_capped_by_backoff_max():
+    client = HTTPClient(backoff_max=5.0)
+    assert client.backoff_delay(0, "120") == 5.0
+    later = datetime.now(timezone.utc) + timedelta(hours=1)
+    assert client.backoff_delay(0, format_datetime(later, usegmt=True)) == 5.0
+
+
+def test_unparsable_retry_after_falls_back_to_jitter(monkeypatch):
+    monkeypatch.setattr(main.random, "uniform", lambda low, high: high)
+    client = HTTPClient(backoff_base=0.5)
+    assert client.backoff_delay(2, "soon") == 2.0
+    assert client.backoff_delay(2, "") == 2.0
+
+
+def test_slots_are_released_between_retries(serve, monkeypatch):
+    server, url = serve((503, {}), (200, {}))
+    client = HTTPClient(pool_size=1, max_retries=1)
+    held = []
+
+    def sleep(delay):
+        # A retry waiting out its backoff must not hold a connection slot
+        acquired = client.slots.acquire(blocking=False)
+        held.append(acquired)
+        if acquired:
+            client.slots.release()
+
+    monkeypatch.setattr(main.time, "sleep", sleep)
+    try:
+        assert client.get(url).status_code == 200
+    finally:
+        client.close()
+    assert held == [True]
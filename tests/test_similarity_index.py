@@ -0,0 +1,67 @@
+import os
+from difflib import SequenceMatcher
+
+import pytest
+
+from main import SimilarityIndex
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def read_lines(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8", newline="\n") as f:
+        return f.read().split("\n")[:-1]
+
+
+def full_scan(history, query, threshold=0.7):
+    """The original lookup: ratio against every past input, the first of the highest ratios wins"""
+    best = None
+    best_ratio = 0
+    for key, text in enumerate(history):
+        matcher = SequenceMatcher(None, query.lower(), text.lower())
+        # Both quick ratios are upper bounds of ratio(), skipping on them never changes the result
+        if matcher.real_quick_ratio() <= max(best_ratio, threshold):
+            continue
+        if matcher.quick_ratio() <= max(best_ratio, threshold):
+            continue
+        ratio = matcher.ratio()
+        if ratio > best_ratio and ratio > threshold:
+            best, best_ratio = key, ratio
+    return (best, best_ratio) if best is not None else None
+
+
+HISTORY = read_lines("conversation.txt")
+QUERIES = read_lines("conversation_queries.txt")
+
+
+@pytest.fixture(scope="module")
+def index():
+    index = SimilarityIndex()
+    for key, text in enumerate(HISTORY):
+        index.add(key, text)
+    return index
+
+
+@pytest.fixture(scope="module")
+def expected():
+    return {query: full_scan(HISTORY, query) for query in QUERIES}
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_best_match_agrees_with_full_scan(index, expected, query):
+    assert index.best_match(query) == expected[query]
+
+
+def test_fixture_has_matches_and_misses(expected):
+    assert sum(result is not None for result in expected.values()) >= 20
+    assert sum(result is None for result in expected.values()) >= 20
+
+
+def test_removed_texts_are_never_returned():
+    removed = SimilarityIndex()
+    for key, text in enumerate(HISTORY):
+        removed.add(key, text)
+    for key in range(100):
+        removed.remove(key)
+    for query in QUERIES[:30]:
+        assert removed.best_match(query) == full_scan([""] * 100 + HISTORY[100:], query)
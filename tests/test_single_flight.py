@@ -0,0 +1,121 @@
+import threading
+import time
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
+
+import pytest
+
+from main import HorizonAI, SingleFlight, normalize_subject
+
+
+def start_leader(inflight, key, release, result="leader result"):
+    """Start a call for key that runs until release is set, and wait until it is in flight"""
+    outcome = {}
+
+    def call():
+        release.wait(10)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def lead():
+        try:
+            outcome["result"] = inflight.do(key, call)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=lead, daemon=True)
+    thread.start()
+    for _ in range(1000):
+        if inflight.pending(key) is not None:
+            break
+        time.sleep(0.005)
+    return thread, outcome
+
+
+def test_follower_shares_the_leaders_result():
+    inflight, release = SingleFlight(), threading.Event()
+    thread, outcome = start_leader(inflight, "page:python", release)
+    follower = {}
+    waiter = threading.Thread(target=lambda: follower.update(result=inflight.do("page:python", lambda: "own")))
+    waiter.start()
+    while inflight.followers == 0:
+        time.sleep(0.005)
+    release.set()
+    waiter.join(10)
+    thread.join(10)
+    assert outcome["result"] == follower["result"] == "leader result"
+    assert inflight.followers == 1
+
+
+def test_follower_timeout_says_what_it_waited_for():
+    inflight, release = SingleFlight(), threading.Event()
+    thread, _ = start_leader(inflight, "page:python", release)
+    try:
+        with pytest.raises(FutureTimeoutError) as raised:
+            inflight.do("page:python", lambda: "own", timeout=0.05)
+    finally:
+        release.set()
+        thread.join(10)
+    assert "timed out after 0.05 s waiting for an in-flight lookup of 'page:python'" == str(raised.value)
+
+
+def test_follower_of_a_cancelled_call_says_so():
+    inflight, release = SingleFlight(), threading.Event()
+    thread, outcome = start_leader(inflight, "page:python", release)
+    errors = []
+
+    def follow():
+        try:
+            inflight.do("page:python", lambda: "own")
+        except CancelledError as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=follow)
+    waiter.start()
+    while inflight.followers == 0:
+        time.sleep(0.005)
+    assert inflight.cancel("page:python")
+    waiter.join(10)
+    release.set()
+    thread.join(10)
+    assert [str(e) for e in errors] == ["the in-flight lookup of 'page:python' was cancelled"]
+    # The running call still finishes for its own caller
+    assert outcome["result"] == "leader result"
+
+
+def test_leader_errors_reach_followers_unchanged():
+    inflight, release = SingleFlight(), threading.Event()
+    error = TimeoutError("upstream timed out")
+    thread, outcome = start_leader(inflight, "page:python", release, result=error)
+    follower = {}
+
+    def follow():
+        try:
+            inflight.do("page:python", lambda: "own")
+        except TimeoutError as e:
+            follower["error"] = e
+
+    waiter = threading.Thread(target=follow)
+    waiter.start()
+    while inflight.followers == 0:
+        time.sleep(0.005)
+    release.set()
+    waiter.join(10)
+    thread.join(10)
+    assert outcome["error"] is error
+    assert follower["error"] is error
+
+
+def test_lookup_reports_a_coalesce_timeout(tmp_path):
+    ai = HorizonAI(mode="headless", cache_path=None, knowledge_path=str(tmp_path / "knowledge.db"),
+                   coalesce_timeout=0.05)
+    release = threading.Event()
+    thread, _ = start_leader(ai.inflight, "page:" + normalize_subject("Python"), release)
+    try:
+        info = ai.get_wikipedia_info("Python")
+    finally:
+        release.set()
+        thread.join(10)
+        ai.shutdown()
+    assert info["exists"] is False
+    assert "timed out after 0.05 s waiting for an in-flight lookup" in info["error"]
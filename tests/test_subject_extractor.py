@@ -0,0 +1,47 @@
+import os
+import re
+
+import pytest
+
+from main import QUESTION_PATTERNS, HorizonAI, SubjectExtractor
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "questions.txt")
+
+
+def read_questions():
+    with open(FIXTURE, "r", encoding="utf-8", newline="\n") as f:
+        return f.read().split("\n")[:-1]
+
+
+def baseline_extract(question):
+    """The original extraction: one regex search per pattern, first match in pattern order wins"""
+    for trigger, terminator in QUESTION_PATTERNS:
+        match = re.search(re.escape(trigger) + r" (.*?)(?:" + re.escape(terminator) + r"|$)", question)
+        if match:
+            return match.group(1).strip()
+    return None
+
+
+QUESTIONS = read_questions()
+EXTRACTOR = SubjectExtractor()
+
+
+def test_corpus_exercises_every_pattern():
+    matched = set()
+    for question in QUESTIONS:
+        for trigger, _ in QUESTION_PATTERNS:
+            if trigger + " " in question.strip().lower():
+                matched.add(trigger)
+    assert matched == {trigger for trigger, _ in QUESTION_PATTERNS}
+
+
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_extract_matches_baseline(question):
+    question = question.strip().lower()
+    assert EXTRACTOR.extract(question) == baseline_extract(question)
+
+
+def test_extract_question_subject_uses_the_extractor():
+    ai = HorizonAI(mode="headless", cache_path=None, knowledge_path=None)
+    assert ai.extract_question_subject("Who is Barack Obama?") == "barack obama"
+    assert ai.extract_question_subject("can you explain who is batman?") == "batman"
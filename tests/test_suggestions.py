@@ -0,0 +1,109 @@
+import random
+import string
+
+import pytest
+
+from main import HorizonAI, SuggestionEngine, normalize_subject
+
+SYLLABLES = ["ka", "lo", "mir", "zen", "tha", "vel", "dor", "qui", "bra", "nes", "sul", "fi", "gor", "ept",
+             "ran", "ox", "wy", "lum"]
+
+
+def show_name(rng):
+    words = ("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))) for _ in range(rng.randint(1, 2)))
+    return " ".join(word.capitalize() for word in words)
+
+
+def typo(rng, text):
+    """One substitution, deletion, insertion or transposition"""
+    chars = list(text)
+    i = rng.randrange(len(chars))
+    op = rng.randrange(4)
+    if op == 0:
+        chars[i] = rng.choice(string.ascii_lowercase)
+    elif op == 1:
+        del chars[i]
+    elif op == 2:
+        chars.insert(i, rng.choice(string.ascii_lowercase))
+    elif i + 1 < len(chars):
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return "".join(chars)
+
+
+def distance(a, b):
+    return SuggestionEngine.distance(normalize_subject(a), normalize_subject(b), 2)
+
+
+@pytest.fixture(scope="module")
+def episode_lists():
+    """20k titles sharing both their first and last seven characters"""
+    rng = random.Random(14)
+    names = list(dict.fromkeys(show_name(rng) for _ in range(30000)))[:20000]
+    titles = [f"List of {name} episodes" for name in names]
+    engine = SuggestionEngine()
+    engine.add_many(titles)
+    return engine, titles
+
+
+@pytest.fixture(scope="module")
+def numbered_episodes():
+    """50k titles that differ only in a number in the middle"""
+    titles = [f"Episode {n} (TV series)" for n in range(50000)]
+    engine = SuggestionEngine()
+    engine.add_many(titles)
+    return engine, titles
+
+
+def test_one_typo_finds_the_intended_list(episode_lists):
+    engine, titles = episode_lists
+    rng = random.Random(1)
+    for _ in range(200):
+        title = rng.choice(titles)
+        assert title in engine.lookup(typo(rng, title))
+
+
+@pytest.mark.parametrize("title", ["Episode 31337 (TV series)", "Episode 3137 (TV series)", "Episode 7 (TV series)"])
+def test_exact_title_comes_first(numbered_episodes, title):
+    engine, _ = numbered_episodes
+    assert engine.lookup(title)[0] == title
+    assert engine.lookup(title.lower())[0] == title
+
+
+def test_one_typo_is_never_answered_with_a_worse_match(numbered_episodes):
+    engine, titles = numbered_episodes
+    rng = random.Random(2)
+    for _ in range(200):
+        title = rng.choice(titles)
+        query = typo(rng, title)
+        results = engine.lookup(query)
+        assert results
+        assert distance(query, results[0]) <= distance(query, title)
+
+
+def test_short_titles_match_a_full_scan():
+    rng = random.Random(3)
+    titles = list(dict.fromkeys("".join(rng.choice("abcdef") for _ in range(rng.randint(1, 6)))
+                                for _ in range(400)))
+    engine = SuggestionEngine()
+    engine.add_many(titles)
+    for _ in range(300):
+        query = "".join(rng.choice("abcdefg") for _ in range(rng.randint(1, 7)))
+        closest = min(distance(query, title) for title in titles)
+        results = engine.lookup(query)
+        if closest > 2:
+            assert results == []
+        else:
+            assert distance(query, results[0]) == closest
+
+
+def test_suggestion_titles_are_seeded_in_the_background(tmp_path):
+    path = tmp_path / "titles.txt"
+    path.write_text("\n".join(f"Episode {n} (TV series)" for n in range(2000)) + "\n", encoding="utf-8")
+    ai = HorizonAI(mode="headless", cache_path=None, knowledge_path=None, suggestion_titles=str(path))
+    try:
+        engine = ai.suggestions
+        ai._suggestions_thread.join(timeout=30)
+        assert len(engine) == 2000
+        assert ai.suggestions.exact("episode 1999 (tv series)") == "Episode 1999 (TV series)"
+    finally:
+        ai.shutdown()